@@ -13,7 +13,9 @@ student and massively fork, clone or upload files to them.
 
 import argparse
 import collections
+import concurrent.futures
 import csv
+import functools
 import http
 import json
 import locale
@@ -143,8 +145,7 @@ class ActionEntries:
 
     def as_gitlab_user(self, entry, glb: gitlab.client.Gitlab, login_column: str):
         if user_login := entry.get(login_column):
-            matching_users = glb.users.list(username=user_login, iterator=True)
-            if user_object := next(matching_users, None):
+            if user_object := mg.get_user_by_username(glb, user_login):
                 return user_object
             else:
                 self.logger.warning(f"User {user_login} not found.")
@@ -154,7 +155,7 @@ class ActionEntries:
         # No corresponding user for the entry.
         return None
 
-    def as_gitlab_users(self, glb: gitlab.client.Gitlab, login_column: str):
+    def as_gitlab_users(self, glb: gitlab.client.Gitlab, login_column: str, workers: int = 1):
         """
         Converts entries to GitLab users.
 
@@ -164,14 +165,28 @@ class ActionEntries:
 
         :param glb: GitLab instance to use
         :param login_column: name of the entry column containing user login
+        :param workers: number of users looked up concurrently, defaults to 1
         :return: generator of (entry, user)
         """
-        for entry in self.entries:
-            yield entry, self.as_gitlab_user(entry, glb, login_column)
+        # Retrieve as many users as possible in bulk first (they are cached),
+        # the rest (e.g. when bulk retrieval is not available) one by one.
+        mg.get_users_by_username(
+            glb,
+            [login for entry in self.entries if (login := entry.get(login_column))]
+        )
+
+        # Users are produced as soon as they are resolved so that
+        # the consumer can start working before all lookups are done.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            users = pool.map(
+                lambda entry: self.as_gitlab_user(entry, glb, login_column),
+                self.entries
+            )
+            yield from zip(self.entries, users)
 
     def as_gitlab_projects(
         self, glb: gitlab.client.Gitlab, project_template: str,
-        allow_duplicates: bool = False
+        allow_duplicates: bool = False, workers: int = 1
     ):
         """
         Converts entries to GitLab projects.
@@ -181,31 +196,50 @@ class ActionEntries:
         For projects that cannot be found, None is returned and a warning
         message is printed.
 
+        Projects are looked up in background threads ahead of the
+        consumer, entries are still produced in their original order.
+
         :param glb: GitLab instance to use
         :param project_template: template for generating project names using entry data
         :param allow_duplicates: whether to return duplicate projects, defaults to False
+        :param workers: number of projects looked up concurrently, defaults to 1
         :return: generator of (entry, project)
         """
 
-        projects_by_path = {}
-        for entry in self.entries:
-            project_path = project_template.format(**entry)
-            if project := projects_by_path.get(project_path):
-                # We have seen the project before, but will return it only if
-                # we allow duplicates to be produced. Otherwise, move on.
-                if allow_duplicates:
-                    yield entry, project
+        def lookup(project_path):
+            try:
+                return mg.get_canonical_project(glb, project_path)
+            except gitlab.exceptions.GitlabGetError:
+                return None
 
-                continue
+        project_paths = [project_template.format_map(entry) for entry in self.entries]
+        unique_paths = list(dict.fromkeys(project_paths))
 
-            # We have not seen the project before, look it up.
-            try:
-                project = mg.get_canonical_project(glb, project_path)
-                projects_by_path[project_path] = project
-                yield entry, project
+        # Projects in a common group can be listed at once (they are cached).
+        mg.prefetch_projects(glb, unique_paths)
 
-            except gitlab.exceptions.GitlabGetError:
-                self.logger.warning(f"Project '{project_path}' not found.")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            # Results come in the order of first occurrence of each path.
+            lookups = pool.map(lookup, unique_paths)
+
+            projects_by_path = {}
+            for entry, project_path in zip(self.entries, project_paths):
+                if project_path in projects_by_path:
+                    # We have seen the project before, but will return it only if
+                    # we allow duplicates to be produced. Otherwise, move on.
+                    project = projects_by_path[project_path]
+                    if project and allow_duplicates:
+                        yield entry, project
+
+                    continue
+
+                # We have not seen the project before, take its lookup result.
+                project = next(lookups)
+                projects_by_path[project_path] = project
+                if project:
+                    yield entry, project
+                else:
+                    self.logger.warning(f"Project '{project_path}' not found.")
 
 
 class ActionEntriesParameter(Parameter):
@@ -236,7 +270,7 @@ class ActionEntriesParameter(Parameter):
         if (parsed_options.entries_csv == '-'):
             entries = _load_entries(sys.stdin)
         else:
-            with open(parsed_options.entries_csv) as entries_csv:
+            with open(parsed_options.entries_csv, newline='') as entries_csv:
                 entries = _load_entries(entries_csv)
 
         return ActionEntries(entries)
@@ -292,6 +326,27 @@ class DryRunActionParameter(ActionParameter):
         )
 
 
+class WorkersActionParameter(ActionParameter):
+    """
+    Parameter annotation to create an option for concurrent processing.
+    """
+
+    def __init__(self, default=1):
+        ActionParameter.__init__(
+            self,
+            'workers',
+            default=default,
+            type=int,
+            metavar='N',
+            help=f'Number of entries processed concurrently, defaults to {default}.'
+        )
+
+    @staticmethod
+    def _dest_name(argument_name):
+        # Fixed name so that the HTTP connection pool can be sized to match.
+        return 'workers_'
+
+
 class LoginColumnActionParameter(ActionParameter):
     """
     Parameter annotation to create an option for specifying login column.
@@ -404,6 +459,13 @@ class CommandParser:
             dest='gitlab_instance',
             help='Which GitLab instance to choose.'
         )
+        self.args_common.add_argument(
+            '--http-cache',
+            default=None,
+            dest='http_cache_dir',
+            metavar='DIR',
+            help='Cache API responses in DIR and revalidate them (requires CacheControl).'
+        )
 
         self.args = argparse.ArgumentParser(
             description='Teachers GitLab for mass actions on GitLab'
@@ -417,6 +479,9 @@ class CommandParser:
 
         self.parsed_options = None
 
+        # Subparsers are built only when needed: typically, only the
+        # invoked command is needed.
+        self.commands = {}
         self.subcommands = {}
 
     def add_command(self, name, callback_func):
@@ -424,6 +489,17 @@ class CommandParser:
         Add whole subcommand.
         """
 
+        self.commands[name] = callback_func
+
+    def _get_subcommand_parser(self, name):
+        """
+        Get subcommand parser, building it on first use.
+        """
+
+        if parser := self.subcommands.get(name):
+            return parser
+
+        callback_func = self.commands[name]
         short_help = callback_func.__doc__
         if short_help is not None:
             short_help = textwrap.dedent(short_help.strip())
@@ -446,6 +522,7 @@ class CommandParser:
         parser.set_defaults(parser=self)
 
         self.subcommands[name] = parser
+        return parser
 
     def parse_args(self, argv):
         """
@@ -453,9 +530,17 @@ class CommandParser:
         """
 
         if len(argv) < 1:
-            self.parsed_options = self.args.parse_args(['help'])
+            argv = ['help']
+
+        if argv[0] in self.commands:
+            self._get_subcommand_parser(argv[0])
         else:
-            self.parsed_options = self.args.parse_args(argv)
+            # Help, top-level options or unknown command: the listing
+            # of all commands is needed.
+            for name in self.commands:
+                self._get_subcommand_parser(name)
+
+        self.parsed_options = self.args.parse_args(argv)
 
         return self.parsed_options
 
@@ -467,12 +552,24 @@ class CommandParser:
         if subcommand is None:
             self.args.print_help()
         else:
-            self.subcommands[subcommand].print_help()
+            self._get_subcommand_parser(subcommand).print_help()
 
     def get_gitlab_instance(self):
+        # Keep at least one connection alive per concurrent request: the
+        # workers and the entry lookups running ahead of them (which use
+        # a pool of the same size).
+        workers = getattr(self.parsed_options, 'workers_', 1)
+        try:
+            session = mg.create_http_session(
+                pool_size=max(16, 2 * workers),
+                cache_dir=self.parsed_options.http_cache_dir
+            )
+        except ImportError:
+            self.args.error("--http-cache requires CacheControl, install teachers-gitlab[cache].")
         return gitlab.Gitlab.from_config(
             self.parsed_options.gitlab_instance,
-            self.parsed_options.gitlab_config_file
+            self.parsed_options.gitlab_config_file,
+            session=session
         )
 
 
@@ -493,23 +590,22 @@ def action_accounts(
         default=False,
         action='store_true',
         help='Try for possibly renamed accounts (e.g. with 1 appended to login).'
-    )
+    ),
+    workers: WorkersActionParameter()
 ):
     """
     List accounts that were not found.
     """
-    users = list(entries.as_gitlab_users(glb, login_column))
+    users = list(entries.as_gitlab_users(glb, login_column, workers))
     if check_renamed_accounts:
         for entry in entries.as_items():
             if not (user_login := entry.get(login_column)):
                 continue
-            matching_users = glb.users.list(username=user_login, iterator=True)
-            if next(matching_users, None):
+            if mg.get_user_by_username(glb, user_login):
                 continue
             for suffix in ['1', '2', '3', '11']:
                 login_with_suffix = user_login + suffix
-                matching_users = glb.users.list(username=login_with_suffix, iterator=True)
-                if not (user_obj := next(matching_users, None)):
+                if not mg.get_user_by_username(glb, login_with_suffix):
                     continue
                 logger.warning("User %s not found, but account for %s exists.", user_login, login_with_suffix)
     if show_summary:
@@ -520,18 +616,40 @@ def action_accounts(
         ))
 
 
+def print_json(data):
+    """
+    Print data as indented JSON to standard output.
+
+    The output is written as it is encoded, without building
+    the whole document in memory first.
+    """
+
+    json.dump(data, sys.stdout, indent=4)
+    sys.stdout.write('\n')
+
+
 def get_regex_blacklist_filter(blacklist_re, func):
-    def accept_all(_):
-        return True
+    """
+    Create filter rejecting objects matching the blacklist.
+
+    Returns None when there is no blacklist (i.e. nothing to filter)
+    so that callers can avoid filtering altogether.
+
+    The same values (e.g. author e-mails) repeat across many objects,
+    hence the match result is remembered for each distinct value.
+    """
 
     def reject_blacklist_matches(obj):
-        return not blacklist_pattern.fullmatch(func(obj))
+        return not is_blacklisted(func(obj))
 
     if blacklist_re:
         blacklist_pattern = re.compile(blacklist_re)
+        is_blacklisted = functools.lru_cache(maxsize=None)(
+            lambda value: blacklist_pattern.fullmatch(value) is not None
+        )
         return reject_blacklist_matches
     else:
-        return accept_all
+        return None
 
 
 def get_commit_author_email_filter(blacklist):
@@ -572,7 +690,14 @@ def action_clone(
         default=None,
         metavar='BLACKLIST',
         help='Commit authors to ignore (regular expression).'
-    )
+    ),
+    reference_path: ActionParameter(
+        'reference',
+        default=None,
+        metavar='LOCAL_REPO_PATH',
+        help='Local repository (e.g. of the parent project) to copy shared objects from.'
+    ),
+    workers: WorkersActionParameter()
 ):
     """
     Clone multiple repositories.
@@ -581,18 +706,26 @@ def action_clone(
     # FIXME: commit and deadline are mutually exclusive
 
     commit_filter = get_commit_author_email_filter(blacklist)
-    for entry, project in entries.as_gitlab_projects(glb, project_template):
+
+    def clone_project(entry_with_project):
+        entry, project = entry_with_project
         if commit_template:
-            last_commit = project.commits.get(commit_template.format(**entry))
+            last_commit = project.commits.get(commit_template.format_map(entry))
         else:
             last_commit = mg.get_commit_before_deadline(
                 glb, project, deadline, branch, commit_filter
             )
 
-        local_path = local_path_template.format(**entry)
-        mg.clone_or_fetch(glb, project, local_path)
+        local_path = local_path_template.format_map(entry)
+        mg.clone_or_fetch(glb, project, local_path, reference_path, checkout=False)
         mg.reset_to_commit(local_path, last_commit.id)
 
+    mg.run_concurrently(
+        clone_project,
+        entries.as_gitlab_projects(glb, project_template, workers=workers),
+        workers
+    )
+
 
 @register_command('fork', 'Fork a project')
 def action_fork(
@@ -623,23 +756,20 @@ def action_fork(
         default=False,
         action='store_true',
         help='Fork even for invalid (e.g. not found) users.'
-    )
+    ),
+    workers: WorkersActionParameter()
 ):
     """
     Fork one (or more) repositories multiple times.
     """
 
-    for entry, user in entries.as_gitlab_users(glb, login_column):
-        if not user and not include_nonexistent:
-            # Skip forking for non-existent users
-            continue
-
-        from_project = mg.get_canonical_project(glb, from_project_template.format(**entry))
+    def fork_for_user(entry_with_user):
+        entry, user = entry_with_user
+        from_project = mg.get_canonical_project(glb, from_project_template.format_map(entry))
 
         user_name = user.username if user else entry.get(login_column)
-        to_full_path = to_project_template.format(**entry)
-        to_namespace = os.path.dirname(to_full_path)
-        to_name = os.path.basename(to_full_path)
+        to_full_path = to_project_template.format_map(entry)
+        to_namespace, _, to_name = to_full_path.rpartition('/')
 
         logger.info(
             "Forking %s to %s/%s for user %s",
@@ -647,12 +777,33 @@ def action_fork(
             to_namespace, to_name, user_name
         )
 
-        to_project = mg.fork_project_idempotent(glb, from_project, to_namespace, to_name)
+        return mg.fork_project_idempotent(glb, from_project, to_namespace, to_name)
+
+    def finish_fork(to_project):
         mg.wait_for_project_to_be_forked(glb, to_project)
 
         if hide_fork:
             mg.remove_fork_relationship(glb, to_project)
 
+    users = [
+        (entry, user)
+        for entry, user in entries.as_gitlab_users(glb, login_column, workers)
+        # Skip forking for non-existent users
+        if user or include_nonexistent
+    ]
+
+    # On re-runs most targets already exist: list them in bulk so that
+    # they are not forked (and refused with a conflict) one by one.
+    mg.prefetch_projects(glb, [
+        to_project_template.format_map(entry)
+        for entry, _ in users
+    ])
+
+    # Request all forks first and only then wait for them: GitLab forks
+    # asynchronously, so the forks are then processed side by side.
+    to_projects = mg.run_concurrently(fork_for_user, users, workers)
+    mg.run_concurrently(finish_fork, to_projects, workers)
+
 
 @register_command('protect', 'Protect a Git branch')
 def action_protect_branch(
@@ -685,13 +836,15 @@ def action_protect_branch(
             "help": "DEPRECATED: Allow developers to push to this branch.",
             "level": gitlab.const.AccessLevel.DEVELOPER
         }]
-    )
+    ),
+    workers: WorkersActionParameter()
 ):
     """
     Set branch protection on multiple projects.
     """
 
-    for _, project in entries.as_gitlab_projects(glb, project_template):
+    def protect_branch(entry_with_project):
+        _, project = entry_with_project
         logger.info(
             "Protecting branch '%s' in %s",
             branch_name, project.path_with_namespace
@@ -705,6 +858,12 @@ def action_protect_branch(
         except gitlab.GitlabError as exp:
             logger.error("- Failed to protect branch: %s", exp)
 
+    mg.run_concurrently(
+        protect_branch,
+        entries.as_gitlab_projects(glb, project_template, workers=workers),
+        workers
+    )
+
 
 def _project_protect_branch(project, branch_name, merge_access_level, push_access_level, logger):
     def branch_get_merge_access_level(branch):
@@ -751,13 +910,15 @@ def action_unprotect_branch(
         required=True,
         metavar='GIT_BRANCH',
         help='Git branch name to unprotect.'
-    )
+    ),
+    workers: WorkersActionParameter()
 ):
     """
     Unprotect branch on multiple projects.
     """
 
-    for _, project in entries.as_gitlab_projects(glb, project_template):
+    def unprotect_branch(entry_with_project):
+        _, project = entry_with_project
         logger.info(
             "Unprotecting branch '%s' in %s",
             branch_name, project.path_with_namespace
@@ -768,6 +929,12 @@ def action_unprotect_branch(
         except gitlab.GitlabError as exp:
             logger.error("- Failed to unprotect branch: %s", exp)
 
+    mg.run_concurrently(
+        unprotect_branch,
+        entries.as_gitlab_projects(glb, project_template, workers=workers),
+        workers
+    )
+
 
 def _project_unprotect_branch(project, branch_name, logger):
     if protected_branch := _project_get_protected_branch(project, branch_name):
@@ -808,13 +975,15 @@ def action_create_tag(
         metavar='COMMIT_MESSAGE_WITH_FORMAT',
         help='Commit message, formatted from CSV columns.'
     ),
+    workers: WorkersActionParameter()
 ):
     """
     Create a tag on a given commit or branch tip.
     """
 
-    for entry, project in entries.as_gitlab_projects(glb, project_template):
-        ref_name = ref_name_template.format(**entry)
+    def create_tag(entry_with_project):
+        entry, project = entry_with_project
+        ref_name = ref_name_template.format_map(entry)
         params = {
             'tag_name': tag_name,
             'ref': ref_name,
@@ -835,6 +1004,12 @@ def action_create_tag(
             else:
                 raise
 
+    mg.run_concurrently(
+        create_tag,
+        entries.as_gitlab_projects(glb, project_template, workers=workers),
+        workers
+    )
+
 
 @register_command('protect-tag', 'Set tag protection')
 def action_protect_tag(
@@ -864,13 +1039,15 @@ def action_protect_tag(
                 "level": gitlab.const.AccessLevel.MAINTAINER
             }
         ]
-    )
+    ),
+    workers: WorkersActionParameter()
 ):
     """
     Set tag protection on multiple projects.
     """
 
-    for _, project in entries.as_gitlab_projects(glb, project_template):
+    def protect_tag(entry_with_project):
+        _, project = entry_with_project
         logger.info(
             "Protecting tag '%s' in %s",
             tag_name, project.path_with_namespace
@@ -881,6 +1058,12 @@ def action_protect_tag(
         except gitlab.GitlabError as exp:
             logger.error("- Failed to protect tag: %s", exp)
 
+    mg.run_concurrently(
+        protect_tag,
+        entries.as_gitlab_projects(glb, project_template, workers=workers),
+        workers
+    )
+
 
 def _project_protect_tag(project, tag_name, create_access_level, logger):
     def tag_get_create_access_level(tag):
@@ -922,12 +1105,14 @@ def action_unprotect_tag(
         metavar='GIT_TAG',
         help='Git tag name to unprotect.'
     ),
+    workers: WorkersActionParameter()
 ):
     """
     Unset tag protection on multiple projects.
     """
 
-    for _, project in entries.as_gitlab_projects(glb, project_template):
+    def unprotect_tag(entry_with_project):
+        _, project = entry_with_project
         logger.info(
             "Unprotecting tag '%s' in %s",
             tag_name, project.path_with_namespace
@@ -938,6 +1123,12 @@ def action_unprotect_tag(
         except gitlab.GitlabError as exp:
             logger.error("- Failed to unprotect tag: %s", exp)
 
+    mg.run_concurrently(
+        unprotect_tag,
+        entries.as_gitlab_projects(glb, project_template, workers=workers),
+        workers
+    )
+
 
 def _project_unprotect_tag(project, tag_name, logger):
     if protected_tag := _project_get_protected_tag(project, tag_name):
@@ -978,7 +1169,7 @@ def action_members(
     members = project.members_all if inherited else project.members
 
     print('login,name')
-    for member in members.list(all=True, iterator=True):
+    for member in members.list(per_page=100, iterator=True):
         print(f"{member.username},{member.name}")
 
 
@@ -994,48 +1185,59 @@ def action_add_member(
         'access-level',
         required=True,
         help="Access level granted to the member in the project."
-    )
+    ),
+    workers: WorkersActionParameter()
 ):
     """
     Add members to multiple projects.
     """
 
-    for entry, project in entries.as_gitlab_projects(glb, project_template, allow_duplicates=True):
-        if user := entries.as_gitlab_user(entry, glb, login_column):
+    def resolve_user(entry_with_project):
+        entry, project = entry_with_project
+        return project, entries.as_gitlab_user(entry, glb, login_column)
+
+    def add_members(project_with_users):
+        project, users = project_with_users
+        for user in users:
             logger.info(
                 "Adding %s (%s) to %s",
                 user.username, access_level.name, project.path_with_namespace
             )
 
-            if dry_run:
-                continue
+        if dry_run:
+            return
 
-            try:
-                _project_add_member(project, user, access_level, logger)
-            except gitlab.GitlabError as exp:
-                logger.error("- Failed to add member: %s", exp)
+        try:
+            if len(users) == 1:
+                _project_add_member(project, users[0], access_level, logger)
+            else:
+                _project_add_members(project, users, access_level, logger)
+        except gitlab.GitlabError as exp:
+            logger.error("- Failed to add member: %s", exp)
+
+    # Group users by project so that users sharing a project are added
+    # to it with as few requests as possible.
+    users_by_project = {}
+    projects_with_users = mg.run_concurrently(
+        resolve_user,
+        entries.as_gitlab_projects(glb, project_template, allow_duplicates=True, workers=workers),
+        workers
+    )
+    for project, user in projects_with_users:
+        if user:
+            _, project_users = users_by_project.setdefault(project.id, (project, {}))
+            project_users[user.id] = user
+
+    mg.run_concurrently(
+        add_members,
+        [(project, list(users.values())) for project, users in users_by_project.values()],
+        workers
+    )
 
 
 def _project_add_member(project, user, access_level, logger):
     if member := _project_get_member(project, user):
-        # If a member already exists with correct access level, do nothing,
-        # otherwise update the access level (project member attributes can
-        # be updated and saved).
-        existing_access_level = gitlab_get_access_level(member.access_level)
-        if existing_access_level == access_level:
-            logger.debug(
-                "- Already exists with '%s' access, skipping.",
-                access_level.name
-            )
-            return
-
-        logger.info(
-            "- Already exists with '%s' access, updating to '%s'.",
-            existing_access_level.name, access_level.name
-        )
-        member.access_level = access_level
-        member.save()
-
+        _project_update_member(member, access_level, logger)
     else:
         # The user is not a member of the project, create a new member.
         project.members.create({
@@ -1044,6 +1246,72 @@ def _project_add_member(project, user, access_level, logger):
         })
 
 
+def _project_add_members(project, users, access_level, logger):
+    """
+    Add several users to one project.
+
+    Existing members are listed once, new ones are invited in bulk
+    (inviting an existing account by its id adds it as a member
+    directly). Users the invitation fails for are added one by one.
+    """
+
+    members = {
+        member.id: member
+        for member in project.members.list(per_page=100, iterator=True)
+    }
+
+    new_users = []
+    for user in users:
+        if member := members.get(user.id):
+            _project_update_member(member, access_level, logger)
+        else:
+            new_users.append(user)
+
+    for start in range(0, len(new_users), 100):
+        batch = new_users[start:start + 100]
+        try:
+            project.invitations.create({
+                'user_id': ','.join(str(user.id) for user in batch),
+                'access_level': access_level,
+            })
+            continue
+        except gitlab.GitlabInvitationError as exp:
+            # Errors are reported per user (by username), retry only those.
+            failures = exp.error_message
+        except gitlab.GitlabCreateError:
+            failures = None
+
+        for user in batch:
+            if not isinstance(failures, dict) or user.username in failures:
+                try:
+                    project.members.create({
+                        'user_id': user.id,
+                        'access_level': access_level,
+                    })
+                except gitlab.GitlabCreateError as exp:
+                    logger.error("- Failed to add member %s: %s", user.username, exp)
+
+
+def _project_update_member(member, access_level, logger):
+    # If a member already exists with correct access level, do nothing,
+    # otherwise update the access level (project member attributes can
+    # be updated and saved).
+    existing_access_level = gitlab_get_access_level(member.access_level)
+    if existing_access_level == access_level:
+        logger.debug(
+            "- Already exists with '%s' access, skipping.",
+            access_level.name
+        )
+        return
+
+    logger.info(
+        "- Already exists with '%s' access, updating to '%s'.",
+        existing_access_level.name, access_level.name
+    )
+    member.access_level = access_level
+    member.save()
+
+
 @register_command('remove-member', 'Remove project member')
 def action_remove_member(
     glb: GitlabInstanceParameter(),
@@ -1051,26 +1319,34 @@ def action_remove_member(
     entries: ActionEntriesParameter(),
     login_column: LoginColumnActionParameter(),
     dry_run: DryRunActionParameter(),
-    project_template: RequiredProjectActionParameter()
+    project_template: RequiredProjectActionParameter(),
+    workers: WorkersActionParameter()
 ):
     """
     Remove members from multiple projects.
     """
 
-    for entry, project in entries.as_gitlab_projects(glb, project_template, allow_duplicates=True):
+    def remove_member(entry_with_project):
+        entry, project = entry_with_project
         if user := entries.as_gitlab_user(entry, glb, login_column):
             logger.info(
                 "Removing %s from %s", user.username, project.path_with_namespace
             )
 
             if dry_run:
-                continue
+                return
 
             try:
                 _project_remove_member(project, user, logger)
             except gitlab.GitlabError as exp:
                 logger.error("- Failed to remove member: %s", exp)
 
+    mg.run_concurrently(
+        remove_member,
+        entries.as_gitlab_projects(glb, project_template, allow_duplicates=True, workers=workers),
+        workers
+    )
+
 
 def _project_remove_member(project, user, logger):
     if member := _project_get_member(project, user):
@@ -1105,7 +1381,8 @@ def action_project_settings(
         metavar="DESCRIPTION_TEXT",
         default=None,
         help='The description of the project, formatted from CSV columns.'
-    )
+    ),
+    workers: WorkersActionParameter()
 ):
     """
     Change project settings.
@@ -1116,7 +1393,8 @@ def action_project_settings(
 
     change_description = description is not None
 
-    for entry, project in entries.as_gitlab_projects(glb, project_template):
+    def change_settings(entry_with_project):
+        entry, project = entry_with_project
         if change_mr_default_target:
             is_self = project.mr_default_target_self
             logger.debug("Project %s: mr_default_target_self=%s.", project.path_with_namespace, is_self)
@@ -1128,12 +1406,18 @@ def action_project_settings(
             else:
                 logger.info("Default merge request target in %s is already set to %s", project.path_with_namespace, mr_default_target)
         if change_description:
-            new_description = description.format(**entry)
+            new_description = description.format_map(entry)
             if not dry_run:
                 project.description = new_description
                 project.save()
             logger.info("Changed description to %s", new_description)
 
+    mg.run_concurrently(
+        change_settings,
+        entries.as_gitlab_projects(glb, project_template, workers=workers),
+        workers
+    )
+
 
 
 @register_command('get-file', 'Fetch given files')
@@ -1171,25 +1455,29 @@ def action_get_file(
         default=None,
         metavar='BLACKLIST',
         help='Commit authors to ignore (regular expression).'
-    )
+    ),
+    workers: WorkersActionParameter()
 ):
     """
     Get file from multiple repositories.
     """
 
     commit_filter = get_commit_author_email_filter(blacklist)
-    for entry, project in entries.as_gitlab_projects(glb, project_template):
+
+    def get_file(entry_with_project):
+        entry, project = entry_with_project
         try:
             last_commit = mg.get_commit_before_deadline(
                 glb, project, deadline, branch, commit_filter
             )
         except gitlab.exceptions.GitlabGetError:
             logger.error("No matching commit in %s", project.path_with_namespace)
-            continue
+            return
 
-        remote_file = remote_file_template.format(**entry)
-        current_content = mg.get_file_contents(glb, project, last_commit.id, remote_file)
-        if current_content is None:
+        remote_file = remote_file_template.format_map(entry)
+        local_file = local_file_template.format_map(entry)
+        size = mg.download_file(glb, project, last_commit.id, remote_file, local_file)
+        if size is None:
             logger.error(
                 "File %s does not exist in %s",
                 remote_file, project.path_with_namespace
@@ -1197,12 +1485,14 @@ def action_get_file(
         else:
             logger.info(
                 "File %s in %s has %dB.",
-                remote_file, project.path_with_namespace, len(current_content)
+                remote_file, project.path_with_namespace, size
             )
 
-            local_file = local_file_template.format(**entry)
-            with open(local_file, "wb") as f:
-                f.write(current_content)
+    mg.run_concurrently(
+        get_file,
+        entries.as_gitlab_projects(glb, project_template, workers=workers),
+        workers
+    )
 
 
 @register_command('put-file', 'Mass file upload')
@@ -1253,7 +1543,8 @@ def action_put_file(
         default=False,
         action='store_true',
         help='Upload file only if it is not present.'
-    )
+    ),
+    workers: WorkersActionParameter()
 ):
     """
     Upload file to multiple repositories.
@@ -1263,51 +1554,114 @@ def action_put_file(
         logger.error("--force-commit and --once together does not make sense, aborting.")
         return
 
-    for entry, project in entries.as_gitlab_projects(glb, project_template):
-        remote_file = remote_file_template.format(**entry)
+    # The same local file is often uploaded to all projects, read (and
+    # hash) it only once.
+    @functools.lru_cache(maxsize=64)
+    def read_local_file(local_file):
+        content = pathlib.Path(local_file).read_bytes()
+        return content, mg.get_content_sha256(content)
+
+    def prepare_upload(entry_with_project):
+        entry, project = entry_with_project
+        remote_file = remote_file_template.format_map(entry)
         extras = {
             'target_filename': remote_file,
         }
         commit_message = commit_message_template.format(GL=extras, **entry)
 
-        local_file = local_file_template.format(**entry)
+        local_file = local_file_template.format_map(entry)
         try:
-            local_file_content = pathlib.Path(local_file).read_text()
+            local_file_content, local_file_hash = read_local_file(local_file)
         except FileNotFoundError:
             if skip_missing_file:
                 logger.error("Skipping %s as %s is missing.", project.path_with_namespace, local_file)
-                continue
+                return None
             else:
                 raise
 
         commit_needed = force_commit
         already_exists = False
         if not force_commit:
-            remote_file_content = mg.get_file_contents(glb, project, branch, remote_file)
-            already_exists = remote_file_content is not None
+            remote_file_hash = mg.get_file_sha256(glb, project, branch, remote_file)
+            already_exists = remote_file_hash is not None
             if already_exists:
-                commit_needed = remote_file_content != local_file_content.encode('utf-8')
+                commit_needed = remote_file_hash != local_file_hash
             else:
                 commit_needed = True
 
-        if commit_needed:
-            if already_exists and only_once:
-                logger.info(
-                    "Not overwriting %s at %s.",
-                    local_file, project.path_with_namespace
-                )
-            else:
-                logger.info(
-                    "Uploading %s to %s as %s",
-                    local_file, project.path_with_namespace, remote_file
-                )
-            if not dry_run:
-                mg.put_file(
-                    glb, project, branch, remote_file,
-                    local_file_content, not only_once, commit_message
-                )
-        else:
+        if not commit_needed:
             logger.info("No change in %s at %s.", local_file, project.path_with_namespace)
+            return None
+
+        if already_exists and only_once:
+            logger.info(
+                "Not overwriting %s at %s.",
+                local_file, project.path_with_namespace
+            )
+            return None
+
+        logger.info(
+            "Uploading %s to %s as %s",
+            local_file, project.path_with_namespace, remote_file
+        )
+        return project, remote_file, local_file_content, commit_message
+
+    def select_first_rows(entries_with_projects):
+        # Only the first row targeting a file of a project uploads it.
+        local_files = {}
+        for entry, project in entries_with_projects:
+            remote_file = remote_file_template.format_map(entry)
+            local_file = local_file_template.format_map(entry)
+            key = (project.id, remote_file)
+            if key not in local_files:
+                local_files[key] = local_file
+                yield entry, project
+            elif local_files[key] != local_file:
+                logger.warning(
+                    "Not uploading %s to %s as %s, %s is uploaded there.",
+                    local_file, project.path_with_namespace, remote_file, local_files[key]
+                )
+
+    def put_files(uploads):
+        project = uploads[0][0]
+        files = [
+            (remote_file, content)
+            for _, remote_file, content, _ in uploads
+        ]
+        # First message is the subject, the others (if different) follow.
+        messages = list(dict.fromkeys(
+            message
+            for _, _, _, message in uploads
+        ))
+        commit_message = messages[0]
+        if len(messages) > 1:
+            commit_message += '\n\n' + '\n'.join(messages[1:])
+        mg.put_files(
+            glb, project, branch, files,
+            not only_once, commit_message
+        )
+
+    uploads = [
+        upload
+        for upload in mg.run_concurrently(
+            prepare_upload,
+            select_first_rows(
+                entries.as_gitlab_projects(glb, project_template, allow_duplicates=True, workers=workers)
+            ),
+            workers
+        )
+        if upload is not None
+    ]
+    if dry_run:
+        return
+
+    # Rows targeting the same project are committed together, in a
+    # single commit with one action per file.
+    uploads_by_project = {}
+    for upload in uploads:
+        uploads_by_project.setdefault(upload[0].id, []).append(upload)
+
+    mg.run_concurrently(put_files, uploads_by_project.values(), workers)
 
 
 @register_command('get-last-pipeline', 'Get last pipeline status')
@@ -1320,18 +1674,26 @@ def action_get_last_pipeline(
         default=False,
         action='store_true',
         help='Print only summaries (ratio of states across projects)'
-    )
+    ),
+    workers: WorkersActionParameter()
 ):
     """
     Get pipeline status of multiple projects.
     """
 
+    def get_pipeline(entry_with_project):
+        _, project = entry_with_project
+        return project, mg.get_last_pipeline(glb, project)
+
+    projects_with_pipelines = mg.run_concurrently(
+        get_pipeline,
+        entries.as_gitlab_projects(glb, project_template, workers=workers),
+        workers
+    )
+
     result = {}
     pipeline_states_only = []
-    for _, project in entries.as_gitlab_projects(glb, project_template):
-        pipelines = project.pipelines.list(iterator=True)
-        last_pipeline = next(pipelines, None)
-
+    for project, last_pipeline in projects_with_pipelines:
         if not last_pipeline:
             result[project.path_with_namespace] = {
                 "status": "none"
@@ -1339,22 +1701,8 @@ def action_get_last_pipeline(
             pipeline_states_only.append("none")
             continue
 
-        entry = {
-            "status": last_pipeline.status,
-            "id": last_pipeline.id,
-            "commit": last_pipeline.sha,
-            "jobs": [],
-        }
-        pipeline_states_only.append(last_pipeline.status)
-
-        for job in last_pipeline.jobs.list(iterator=True):
-            entry["jobs"].append({
-                "status": job.status,
-                "id": job.id,
-                "name": job.name,
-            })
-
-        result[project.path_with_namespace] = entry
+        pipeline_states_only.append(last_pipeline["status"])
+        result[project.path_with_namespace] = last_pipeline
 
     if summary_only:
         summary_by_overall_status = collections.Counter(pipeline_states_only)
@@ -1363,7 +1711,7 @@ def action_get_last_pipeline(
             print("{}: {} ({:.0f}%)".format(state, count, 100 * count / states_len))
         print(f"total: {states_len}")
     else:
-        print(json.dumps(result, indent=4))
+        print_json(result)
 
 
 @register_command('get-pipeline-at-commit', 'Get pipeline status for a commit')
@@ -1377,15 +1725,16 @@ def action_get_pipeline_at_commit(
         metavar='COMMIT_WITH_FORMAT',
         help='Commit to read pipeline status at, formatted from CSV columns.'
     ),
+    workers: WorkersActionParameter()
 ):
     """
     Get pipeline status of multiple projects at or prior to specified
     commit while ignoring skipped pipelines.
     """
 
-    result = {}
-    for entry, project in entries.as_gitlab_projects(glb, project_template):
-        commit_sha = commit_template.format(**entry) if commit_template else None
+    def get_pipeline(entry_with_project):
+        entry, project = entry_with_project
+        commit_sha = commit_template.format_map(entry) if commit_template else None
 
         found_commit = False
         found_pipeline = None
@@ -1417,13 +1766,19 @@ def action_get_pipeline_at_commit(
                         "id": job.id,
                         "name": job.name,
                     }
-                    for job in found_pipeline.jobs.list(iterator=True)
+                    for job in found_pipeline.jobs.list(per_page=100, iterator=True)
                 ],
             }
 
-        result[project.path_with_namespace] = entry
+        return project.path_with_namespace, entry
 
-    print(json.dumps(result, indent=4))
+    result = dict(mg.run_concurrently(
+        get_pipeline,
+        entries.as_gitlab_projects(glb, project_template, workers=workers),
+        workers
+    ))
+
+    print_json(result)
 
 
 @register_command('deadline-commit', 'Get commits for a deadline')
@@ -1473,68 +1828,90 @@ def action_deadline_commits(
         default=None,
         metavar='OUTPUT_FILENAME',
         help='Output file, defaults to stdout.'
-    )
+    ),
+    workers: WorkersActionParameter()
 ):
     """
     Get last commits before deadline.
     """
 
-    output = open(output_filename, 'w') if output_filename else sys.stdout
-    print(output_header, file=output)
+    class CommitMock:
+        def __init__(self, commit_id):
+            self.id = commit_id
 
-    commit_filter = get_commit_author_email_filter(blacklist)
-    for entry, project in entries.as_gitlab_projects(glb, project_template):
-        prefer_tag = prefer_tag_template.format(**entry) if prefer_tag_template else None
-        branch = branch_template.format(**entry)
+    def get_row(entry_with_project):
+        entry, project = entry_with_project
+        prefer_tag = prefer_tag_template.format_map(entry) if prefer_tag_template else None
+        branch = branch_template.format_map(entry)
         try:
             last_commit = mg.get_commit_before_deadline(
                 glb, project, deadline, branch, commit_filter, prefer_tag
             )
         except gitlab.exceptions.GitlabGetError:
-            class CommitMock:
-                def __init__(self, commit_id):
-                    self.id = commit_id
-
             last_commit = CommitMock('0000000000000000000000000000000000000000')
 
         logger.debug("%s at %s", project.path_with_namespace, last_commit.id)
-        line = output_template.format(commit=last_commit, **entry)
-        print(line, file=output)
+        return output_template.format(commit=last_commit, **entry)
 
+    commit_filter = get_commit_author_email_filter(blacklist)
     if output_filename:
-        output.close()
+        output = open(output_filename, 'w', buffering=64 * 1024)
+    else:
+        output = sys.stdout
+    output.write(output_header + '\n')
+
+    # Rows are written (in entry order) as soon as they are ready, rows
+    # written before a failure are kept.
+    try:
+        rows = mg.map_concurrently(
+            get_row,
+            entries.as_gitlab_projects(glb, project_template, workers=workers),
+            workers
+        )
+        for row in rows:
+            output.write(row + '\n')
+    finally:
+        if output_filename:
+            output.close()
 
 
 @register_command('commit-stats', 'Get basic commit statistics')
 def action_commit_stats(
     glb: GitlabInstanceParameter(),
     entries: ActionEntriesParameter(),
-    project_template: RequiredProjectActionParameter()
+    project_template: RequiredProjectActionParameter(),
+    workers: WorkersActionParameter()
 ):
     """
     Get basic added/removed lines for projects.
     """
 
-    result = []
-    for _, project in entries.as_gitlab_projects(glb, project_template):
-        commits = project.commits.list(all=True, iterator=True)
+    def get_stats(entry_with_project):
+        _, project = entry_with_project
+        # The listing can include stats, no need to query each commit separately.
+        commits = project.commits.list(with_stats=True, per_page=100, iterator=True)
         commit_details = {}
         for c in commits:
-            info = project.commits.get(c.id)
             commit_details[c.id] = {
-                'parents': info.parent_ids,
-                'subject': info.title,
-                'line_stats': info.stats,
-                'author_email': info.author_email,
-                'author_date': info.authored_date,
+                'parents': c.parent_ids,
+                'subject': c.title,
+                'line_stats': c.stats,
+                'author_email': c.author_email,
+                'author_date': c.authored_date,
             }
 
-        result.append({
+        return {
             'project': project.path_with_namespace,
             'commits': commit_details,
-        })
+        }
+
+    result = mg.run_concurrently(
+        get_stats,
+        entries.as_gitlab_projects(glb, project_template, workers=workers),
+        workers
+    )
 
-    print(json.dumps(result, indent=4))
+    print_json(result)
 
 
 @register_command('help-markdown', 'Generate Markdown documentation for all commands.')
@@ -6,15 +6,136 @@ Helper GitLab functions.
 """
 
 import base64
+import concurrent.futures
+import functools
+import hashlib
 import http
 import logging
 import os
 import pathlib
+import posixpath
+import random
 import subprocess
 import time
+import weakref
 
 import gitlab
+import gitlab.v4.objects
 import requests
+import requests.adapters
+
+
+class GitOperationError(Exception):
+    """
+    Local Git operation failed.
+    """
+
+
+class GitCloneError(GitOperationError):
+    """
+    Repository could not be cloned.
+    """
+
+
+class GitFetchError(GitOperationError):
+    """
+    Repository could not be fetched.
+    """
+
+
+class GitResetError(GitOperationError):
+    """
+    Repository could not be reset to a commit.
+    """
+
+
+class NoCommitBeforeDeadline(gitlab.exceptions.GitlabGetError):
+    """
+    There is no (matching) commit before the deadline.
+    """
+
+
+class _StreamBypassingAdapter(requests.adapters.BaseAdapter):
+    """
+    Transport adapter that sends streamed requests (e.g. file downloads)
+    around the caching one, which would buffer the whole body to store it.
+    """
+
+    def __init__(self, cached, plain):
+        super().__init__()
+        self.cached = cached
+        self.plain = plain
+
+    def send(self, request, stream=False, **kwargs):
+        adapter = self.plain if stream else self.cached
+        return adapter.send(request, stream=stream, **kwargs)
+
+    def close(self):
+        self.cached.close()
+        self.plain.close()
+
+
+def create_http_session(pool_size=16, cache_dir=None):
+    """
+    Create HTTP session with a connection pool large enough to keep
+    connections to the GitLab server alive across all API calls.
+
+    :param pool_size: Maximum number of kept-alive connections.
+    :param cache_dir: Directory for caching responses, when set,
+        unchanged resources are revalidated with If-None-Match
+        instead of being downloaded again (requires CacheControl).
+        Streamed responses (file downloads) are never cached.
+    """
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+    )
+    if cache_dir:
+        import cachecontrol
+        import cachecontrol.caches
+
+        adapter = _StreamBypassingAdapter(
+            cachecontrol.CacheControlAdapter(
+                cache=cachecontrol.caches.FileCache(cache_dir),
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+            ),
+            adapter
+        )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def run_concurrently(func, items, workers):
+    """
+    Call func on each item, using a pool of worker threads.
+
+    Results are returned in the order of items, the first exception
+    raised by func is propagated to the caller.
+
+    :param func: Function to call with each item.
+    :param items: Iterable of items to process.
+    :param workers: Maximum number of concurrently running calls.
+    """
+
+    return list(map_concurrently(func, items, workers))
+
+
+def map_concurrently(func, items, workers):
+    """
+    Same as run_concurrently but results are yielded (in the order of
+    items) as soon as they are available.
+    """
+
+    if workers <= 1:
+        yield from map(func, items)
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(func, items)
 
 
 def retries(
@@ -26,6 +147,11 @@ def retries(
     """
     To be used in for-loops to try action multiple times.
     Throws exception on time-out.
+
+    The loop runs until the time-out (n * interval when not given); n
+    itself is used only to compute the interval when both are given.
+    The first attempts follow each other quickly, the delay then grows
+    exponentially up to the interval, jittered around it.
     """
 
     if (n is None) and (timeout is None):
@@ -36,71 +162,424 @@ def retries(
 
     if timeout is None:
         timeout = n * interval
-    remaining = timeout
+    deadline = time.monotonic() + timeout
     n = 0
-    while remaining > 0:
-        remaining = remaining - interval
+    while True:
         n = n + 1
         yield n
-        time.sleep(interval)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(remaining, get_backoff_delay(n, interval / 8, interval, jitter=0.25)))
     raise Exception(message)
 
 
-def retry_on_exception(message, exceptions):
+def _is_transient_error(ex):
+    """
+    Tell whether an error is worth retrying.
+
+    GitLab errors are transient only when the server is overloaded (429)
+    or failing (5xx), client errors (e.g. 404) would fail again.
+    """
+
+    if isinstance(ex, gitlab.exceptions.GitlabError):
+        code = ex.response_code
+        return (code == http.HTTPStatus.TOO_MANY_REQUESTS) or ((code is not None) and (code >= 500))
+    return True
+
+
+def get_backoff_delay(attempt, base=1, limit=60, jitter=None):
+    """
+    Compute delay before next attempt using exponential backoff with
+    jitter (so that concurrent workers do not retry in lockstep).
+
+    :param attempt: Number of attempts made so far (starting from 1).
+    :param base: Delay after the first attempt (before jitter).
+    :param limit: Maximum delay (before jitter).
+    :param jitter: Relative spread of the delay around its nominal value
+        (e.g. 0.25 for +-25 %), None for full jitter between zero and
+        the nominal value.
+    """
+
+    delay = min(limit, base * 2 ** (attempt - 1))
+    if jitter is None:
+        return random.uniform(0, delay)
+    return delay * random.uniform(1 - jitter, 1 + jitter)
+
+
+def retry_on_exception(message, exceptions, attempts=8):
     """
     Decorator for function that should be retried on some kind of exception.
+
+    Only transient errors are retried (see _is_transient_error), with
+    exponentially growing delays between the attempts (4 s up to 60 s,
+    about four minutes in total to outlast e.g. a server restart).
     """
 
+    exceptions = tuple(exceptions)
+
     def decorator(func):
         """
         Actual decorator (because we need to process arguments).
         """
 
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
             """
             Wrapper calling the original function.
             """
             logger = logging.getLogger('retry_on_exception')
-            last_ex = None
-            for _ in retries(6, timeout=240):
+            for attempt in range(1, attempts + 1):
                 try:
                     return func(*args, **kwargs)
-                except Exception as ex:
-                    for allowed in exceptions:
-                        if isinstance(ex, allowed):
-                            last_ex = ex
-                            if '%s' in message:
-                                logger.warning(message, ex)
-                            else:
-                                logger.warning(message)
-                            continue
-                    if not last_ex:
-                        raise ex
-                    time.sleep(1)
-            raise last_ex
+                except exceptions as ex:
+                    if (attempt == attempts) or not _is_transient_error(ex):
+                        raise
+                    if '%s' in message:
+                        logger.warning(message, ex)
+                    else:
+                        logger.warning(message)
+                    time.sleep(get_backoff_delay(attempt, base=4, jitter=0.25))
 
         return wrapper
 
     return decorator
 
 
+# Projects already retrieved, per GitLab instance and keyed by both
+# project id and path.
+_project_cache = weakref.WeakKeyDictionary()
+
+
+def _remember_project(glb, project):
+    """
+    Store a retrieved project in the cache.
+    """
+
+    cache = _project_cache.setdefault(glb, {})
+    cache[project.id] = project
+    cache[project.path_with_namespace] = project
+    return project
+
+
+def invalidate_project_cache(glb, project):
+    """
+    Drop a project from the cache so that next lookup retrieves it again.
+
+    :param glb: GitLab instance.
+    :param project: Either object already or path or project id.
+    """
+
+    cache = _project_cache.get(glb, {})
+    if isinstance(project, gitlab.v4.objects.Project):
+        cache.pop(project.id, None)
+        cache.pop(project.path_with_namespace, None)
+    elif cached := cache.pop(project, None):
+        invalidate_project_cache(glb, cached)
+
+
 @retry_on_exception(
     'Failed to canonicalize a project, will retry...',
-    [requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout, gitlab.exceptions.GitlabHttpError]
+    [requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout, gitlab.exceptions.GitlabError]
 )
-def get_canonical_project(glb, project):
+def get_canonical_project(glb, project, lazy=False):
     """
     Ensure we have an instance of gitlab.*.Project.
 
+    Projects retrieved by path or id are cached, use
+    invalidate_project_cache() to force a refresh.
+
     :param glb: GitLab instance.
     :param project: Either object already or path or project id.
+    :param lazy: Do not retrieve the project if not cached, the returned
+        object can be used only to access its managers and methods.
     """
 
-    if isinstance(project, (int, str)):
-        return glb.projects.get(project)
-    if isinstance(project, gitlab.v4.objects.Project):
-        return project
-    raise Exception("Unexpected object type.")
+    return _canonicalize_project(project, glb, lazy)
+
+
+@functools.singledispatch
+def _canonicalize_project(project, glb, lazy):
+    """
+    Convert project to gitlab.*.Project, dispatched on type of project.
+    """
+
+    raise TypeError("Unexpected object type.")
+
+
+@_canonicalize_project.register(int)
+@_canonicalize_project.register(str)
+def _canonicalize_project_reference(project, glb, lazy):
+    if cached := _project_cache.get(glb, {}).get(project):
+        return cached
+    if lazy:
+        # Lazy objects have no attributes, hence they are not cached.
+        return glb.projects.get(project, lazy=True)
+    return _remember_project(glb, glb.projects.get(project))
+
+
+@_canonicalize_project.register(gitlab.v4.objects.Project)
+def _canonicalize_project_object(project, glb, lazy):
+    return project
+
+
+def prefetch_projects(glb, project_paths, min_count=10, overhead=4):
+    """
+    Retrieve projects sharing a group by listing the group instead of
+    getting them one by one.
+
+    Projects found are stored in the project cache, the rest (or all of
+    them when the listing is not possible) are left to be retrieved by
+    get_canonical_project(). The listing stops when all projects were
+    found or after retrieving too many unrelated projects.
+
+    :param glb: GitLab instance.
+    :param project_paths: Full paths of the projects.
+    :param min_count: Minimal number of projects to retrieve for the
+        listing to be worth it.
+    :param overhead: How many projects (relative to the number of wanted
+        ones) may be listed before giving up.
+    """
+
+    cache = _project_cache.setdefault(glb, {})
+    wanted = {path for path in project_paths if path not in cache}
+    if len(wanted) < min_count:
+        return
+
+    namespaces = [path.split('/')[:-1] for path in wanted]
+    common = []
+    for parts in zip(*namespaces):
+        if len(set(parts)) != 1:
+            break
+        common.append(parts[0])
+    if not common:
+        return
+
+    group = glb.groups.get('/'.join(common), lazy=True)
+    try:
+        listing = group.projects.list(
+            include_subgroups=any(len(parts) > len(common) for parts in namespaces),
+            with_shared=False,
+            per_page=100,
+            iterator=True,
+        )
+        for listed, group_project in enumerate(listing, start=1):
+            if group_project.path_with_namespace in wanted:
+                wanted.remove(group_project.path_with_namespace)
+                _remember_project(glb, gitlab.v4.objects.Project(glb.projects, group_project.attributes))
+            if not wanted or listed >= overhead * len(project_paths):
+                break
+    except (requests.exceptions.RequestException, gitlab.exceptions.GitlabError) as ex:
+        # Not a group, no access etc.: projects will be retrieved one by one.
+        logging.getLogger('gitlab-prefetch').debug("Failed to list group projects: %s", ex)
+
+
+# Users already looked up (None when not found), per GitLab instance
+# and keyed by lowercase username.
+_user_cache = weakref.WeakKeyDictionary()
+
+
+@retry_on_exception(
+    'Failed to look up a user, will retry...',
+    [requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout, gitlab.exceptions.GitlabError]
+)
+def get_user_by_username(glb, username):
+    """
+    Get user by login or None if there is no such user.
+
+    Results are cached, including users that were not found.
+
+    :param glb: GitLab instance.
+    :param username: User login.
+    """
+
+    cache = _user_cache.setdefault(glb, {})
+    key = username.lower()
+    if key not in cache:
+        matching_users = glb.users.list(username=username, iterator=True)
+        cache[key] = next(matching_users, None)
+    return cache[key]
+
+
+# GitLab instances where GraphQL API is not available (the request
+# itself failed), it is not tried again for them.
+_graphql_unavailable = weakref.WeakSet()
+
+
+def graphql_query(glb, query, variables):
+    """
+    Execute GraphQL query.
+
+    Returns the data part of the response or None if the query failed
+    (e.g. GraphQL API is not available), callers are expected to fall
+    back to the REST API then.
+
+    :param glb: GitLab instance.
+    :param query: GraphQL query.
+    :param variables: Dictionary with query variables.
+    """
+
+    logger = logging.getLogger('gitlab-graphql')
+    if glb in _graphql_unavailable:
+        return None
+
+    try:
+        response = glb.http_post(
+            glb.url + '/api/graphql',
+            post_data={
+                'query': query,
+                'variables': variables,
+            }
+        )
+    except (requests.exceptions.RequestException, gitlab.exceptions.GitlabError) as ex:
+        logger.debug("GraphQL query failed, using REST API only: %s", ex)
+        _graphql_unavailable.add(glb)
+        return None
+
+    if response.get('errors') or not response.get('data'):
+        logger.debug("GraphQL query failed: %s", response.get('errors'))
+        return None
+
+    return response['data']
+
+
+def _get_id_from_global_id(global_id):
+    """
+    Convert GraphQL global id (gid://gitlab/User/42) to REST id (42).
+    """
+
+    return int(global_id.rsplit('/', 1)[-1])
+
+
+_USERS_QUERY = """
+query($usernames: [String!], $first: Int) {
+  users(usernames: $usernames, first: $first) {
+    nodes {
+      id
+      username
+      name
+    }
+  }
+}
+"""
+
+
+def get_users_by_username(glb, usernames, batch_size=100):
+    """
+    Retrieve multiple users at once through GraphQL.
+
+    Returns dictionary indexed by lowercase username, users that were not
+    found are missing. If the GraphQL API is not available, the dictionary
+    is empty and callers are expected to look up the users one by one.
+
+    :param glb: GitLab instance.
+    :param usernames: Logins of the users to retrieve.
+    :param batch_size: Number of users retrieved by a single query.
+    """
+
+    usernames = list(dict.fromkeys(usernames))
+    result = {}
+    for start in range(0, len(usernames), batch_size):
+        batch = usernames[start:start + batch_size]
+        data = graphql_query(glb, _USERS_QUERY, {
+            'usernames': batch,
+            'first': len(batch),
+        })
+        if data is None:
+            return {}
+
+        for node in data['users']['nodes']:
+            user = gitlab.v4.objects.User(glb.users, {
+                'id': _get_id_from_global_id(node['id']),
+                'username': node['username'],
+                'name': node['name'],
+            })
+            result[user.username.lower()] = user
+
+    _user_cache.setdefault(glb, {}).update(result)
+    return result
+
+
+_LAST_PIPELINE_QUERY = """
+query($project: ID!) {
+  project(fullPath: $project) {
+    pipelines(first: 1) {
+      nodes {
+        id
+        sha
+        status
+        jobs(retried: false, jobKind: BUILD, first: 100) {
+          pageInfo {
+            hasNextPage
+          }
+          nodes {
+            id
+            name
+            status
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+def get_last_pipeline(glb, project):
+    """
+    Get summary of the last pipeline of a project.
+
+    Returns dictionary with pipeline status, id, commit and jobs (each
+    with status, id and name) or None if there is no pipeline. The
+    pipeline together with its jobs is retrieved with a single GraphQL
+    query if possible.
+    """
+
+    project = get_canonical_project(glb, project)
+    data = graphql_query(glb, _LAST_PIPELINE_QUERY, {
+        'project': project.path_with_namespace,
+    })
+    if data and data['project']:
+        pipelines = data['project']['pipelines']['nodes']
+        if not pipelines:
+            return None
+        pipeline = pipelines[0]
+        if not pipeline['jobs']['pageInfo']['hasNextPage']:
+            jobs = [
+                {
+                    'status': job['status'].lower(),
+                    'id': _get_id_from_global_id(job['id']),
+                    'name': job['name'],
+                }
+                for job in pipeline['jobs']['nodes']
+            ]
+            return {
+                'status': pipeline['status'].lower(),
+                'id': _get_id_from_global_id(pipeline['id']),
+                'commit': pipeline['sha'],
+                # Same order as in REST API: newest first.
+                'jobs': sorted(jobs, key=lambda job: job['id'], reverse=True),
+            }
+
+    # Fall back to REST API.
+    pipelines = project.pipelines.list(per_page=1, get_all=False)
+    if not pipelines:
+        return None
+
+    last_pipeline = pipelines[0]
+    return {
+        'status': last_pipeline.status,
+        'id': last_pipeline.id,
+        'commit': last_pipeline.sha,
+        'jobs': [
+            {
+                'status': job.status,
+                'id': job.id,
+                'name': job.name,
+            }
+            for job in last_pipeline.jobs.list(per_page=100, iterator=True)
+        ],
+    }
 
 
 def wait_for_project_to_be_forked(glb, project_path, timeout=None):
@@ -116,19 +595,25 @@ def wait_for_project_to_be_forked(glb, project_path, timeout=None):
         if not project.empty_repo:
             return
         # Force refresh (why project.refresh() does not work?)
+        invalidate_project_cache(glb, project)
         project = get_canonical_project(glb, project.path_with_namespace)
 
 
 @retry_on_exception(
     'Failed to fork project, will retry...',
-    [requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout, gitlab.exceptions.GitlabHttpError]
+    [requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout, gitlab.exceptions.GitlabError]
 )
 def fork_project_idempotent(glb, parent, fork_namespace, fork_name):
     """
     Fork existing project or nothing if already forked.
     """
 
-    parent = get_canonical_project(glb, parent)
+    # Already known (e.g. prefetched) target means we forked it before.
+    fork_path = "{}/{}".format(fork_namespace, fork_name)
+    if existing := _project_cache.get(glb, {}).get(fork_path):
+        return existing
+
+    parent = get_canonical_project(glb, parent, lazy=True)
 
     try:
         fork_handle = parent.forks.create({
@@ -136,14 +621,15 @@ def fork_project_idempotent(glb, parent, fork_namespace, fork_name):
             'path': fork_name,
             'name': fork_name,
         })
-        fork_identity = fork_handle.id
     except gitlab.GitlabCreateError as exp:
         if exp.response_code == http.HTTPStatus.CONFLICT:
-            fork_identity = "{}/{}".format(fork_namespace, fork_name)
+            return get_canonical_project(glb, fork_path)
         else:
             raise
 
-    return get_canonical_project(glb, fork_identity)
+    # The response already describes the new project, no need to query it again.
+    fork = gitlab.v4.objects.Project(glb.projects, fork_handle.attributes)
+    return _remember_project(glb, fork)
 
 
 def remove_fork_relationship(glb, project):
@@ -151,7 +637,7 @@ def remove_fork_relationship(glb, project):
     Remove the 'forked from' relationship of a project.
     """
 
-    project = get_canonical_project(glb, project)
+    project = get_canonical_project(glb, project, lazy=True)
     try:
         project.delete_fork_relation()
     except gitlab.GitlabDeleteError as exp:
@@ -163,70 +649,220 @@ def remove_fork_relationship(glb, project):
 
 @retry_on_exception(
     'Failed to create tag, will retry...',
-    [requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout, gitlab.exceptions.GitlabHttpError]
+    [requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout, gitlab.exceptions.GitlabError]
 )
 def create_tag(glb, project, tag_params):
-    project = get_canonical_project(glb, project)
+    project = get_canonical_project(glb, project, lazy=True)
     project.tags.create(tag_params)
 
 
-@retry_on_exception(
-    'Failed to put file, will retry...',
-    [requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout, gitlab.exceptions.GitlabHttpError]
-)
 def put_file(glb, project, branch, file_path, file_contents, overwrite, commit_message):
     """
     Commit a file, overwriting existing content forcefully.
     """
 
-    project = get_canonical_project(glb, project)
+    return put_files(glb, project, branch, [(file_path, file_contents)], overwrite, commit_message)
+
+
+@retry_on_exception(
+    'Failed to put files, will retry...',
+    [requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout, gitlab.exceptions.GitlabError]
+)
+def put_files(glb, project, branch, files, overwrite, commit_message):
+    """
+    Commit multiple files in a single commit.
+
+    :param files: List of (file_path, file_contents) tuples, contents
+        can be either str or bytes.
+    :param overwrite: Whether to overwrite existing files or skip them.
+    :return: Created commit or None if there was nothing to commit.
+    """
+
+    project = get_canonical_project(glb, project, lazy=True)
     commit_data = {
         'branch': branch,
         'commit_message': commit_message,
         'actions': [
-            {
-                'action': 'create',
-                'file_path': file_path,
-                'content': file_contents,
-            },
+            _get_create_file_action(file_path, file_contents)
+            for file_path, file_contents in files
         ],
     }
     try:
         return project.commits.create(commit_data)
     except gitlab.exceptions.GitlabCreateError as exp:
-        if exp.response_code == http.HTTPStatus.BAD_REQUEST:
-            if overwrite:
-                commit_data['actions'][0]['action'] = 'update'
-                return project.commits.create(commit_data)
-            else:
-                return None
-        else:
+        if exp.response_code != http.HTTPStatus.BAD_REQUEST:
             raise
 
+    # Some of the files already exist: find out which ones and either
+    # update them or drop them from the commit.
+    existing_files = _get_existing_files(
+        project, branch,
+        [action['file_path'] for action in commit_data['actions']]
+    )
+    actions = []
+    for action in commit_data['actions']:
+        if action['file_path'] in existing_files:
+            if not overwrite:
+                continue
+            action['action'] = 'update'
+        actions.append(action)
+
+    if not actions:
+        return None
+
+    commit_data['actions'] = actions
+    return project.commits.create(commit_data)
+
+
+def _get_create_file_action(file_path, file_contents):
+    """
+    Prepare commit action creating a file.
+
+    Binary contents are sent base64-encoded, as-is, without any
+    conversion to text.
+    """
+
+    if isinstance(file_contents, bytes):
+        return {
+            'action': 'create',
+            'file_path': file_path,
+            'content': base64.b64encode(file_contents).decode('ascii'),
+            'encoding': 'base64',
+        }
+
+    return {
+        'action': 'create',
+        'file_path': file_path,
+        'content': file_contents,
+    }
+
+
+def _get_existing_files(project, branch, file_paths):
+    """
+    Return set of given paths that exist as files in the repository.
+    """
+
+    existing = set()
+    for directory in {posixpath.dirname(path) for path in file_paths}:
+        tree = project.repository_tree(path=directory, ref=branch, per_page=100, iterator=True)
+        for item in tree:
+            if item['type'] == 'blob':
+                existing.add(posixpath.join(directory, item['name']))
+    return existing.intersection(file_paths)
+
 
 @retry_on_exception(
     'Failed to get file, will retry...',
-    [requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout, gitlab.exceptions.GitlabHttpError]
+    [requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout, gitlab.exceptions.GitlabError]
 )
 def get_file_contents(glb, project, branch, file_path):
     """
     Retrieve current file contents on a GitLab repository.
+
+    :return: File contents as bytes or None if there is no such file.
     """
 
-    project = get_canonical_project(glb, project)
-    base_filename = os.path.basename(file_path)
-    files = project.repository_tree(
-        path=os.path.dirname(file_path),
-        ref=branch,
-        all=True,
-        as_list=False
-    )
-    current_file = [f for f in files if f['name'] == base_filename]
-    if not current_file:
-        return None
-    file_info = project.repository_blob(current_file[0]['id'])
-    content = base64.b64decode(file_info['content'])
-    return content
+    project = get_canonical_project(glb, project, lazy=True)
+    try:
+        return project.files.raw(file_path=file_path, ref=branch)
+    except gitlab.exceptions.GitlabGetError as exp:
+        if exp.response_code == http.HTTPStatus.NOT_FOUND:
+            return None
+        raise
+
+
+@retry_on_exception(
+    'Failed to get file metadata, will retry...',
+    [requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout, gitlab.exceptions.GitlabError]
+)
+def get_file_sha256(glb, project, branch, file_path):
+    """
+    Retrieve SHA-256 of a file on a GitLab repository without its contents.
+
+    Only a HEAD request is sent, GitLab reports the hash in a header.
+
+    :return: Hex digest or None if there is no such file.
+    """
+
+    project = get_canonical_project(glb, project, lazy=True)
+    try:
+        headers = project.files.head(file_path, ref=branch)
+    except gitlab.exceptions.GitlabHeadError as exp:
+        if exp.response_code == http.HTTPStatus.NOT_FOUND:
+            return None
+        raise
+    return headers['X-Gitlab-Content-Sha256']
+
+
+def get_content_sha256(content):
+    """
+    Compute SHA-256 of file contents the same way GitLab does.
+
+    :param content: File contents as str (encoded as UTF-8) or bytes.
+    """
+
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+@retry_on_exception(
+    'Failed to download file, will retry...',
+    [requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout, gitlab.exceptions.GitlabError]
+)
+def download_file(glb, project, branch, file_path, local_path):
+    """
+    Download file from a GitLab repository into a local file.
+
+    The content is streamed to a temporary file next to the local one as
+    it arrives and moved into place once complete; the local file is
+    created (or replaced) only if the remote one exists.
+
+    :return: Number of bytes written or None if there is no such file.
+    """
+
+    project = get_canonical_project(glb, project, lazy=True)
+    partial_path = f'{local_path}.part'
+    output = None
+    size = 0
+
+    def write_chunk(chunk):
+        nonlocal output, size
+        if output is None:
+            output = open(partial_path, 'wb')
+        output.write(chunk)
+        size += len(chunk)
+
+    def discard_partial():
+        if output is not None:
+            output.close()
+            os.remove(partial_path)
+
+    try:
+        project.files.raw(
+            file_path=file_path,
+            ref=branch,
+            streamed=True,
+            action=write_chunk,
+            chunk_size=64 * 1024
+        )
+    except gitlab.exceptions.GitlabGetError as exp:
+        discard_partial()
+        if exp.response_code == http.HTTPStatus.NOT_FOUND:
+            return None
+        raise
+    except BaseException:
+        discard_partial()
+        raise
+
+    if output is None:
+        # Empty file produces no chunks.
+        open(local_path, 'wb').close()
+    else:
+        output.close()
+        os.replace(partial_path, local_path)
+
+    return size
 
 
 def get_timestamp(ts):
@@ -256,22 +892,28 @@ def get_commit_with_tag(glb, project, tag_name):
     Returns the commit object or 'None' if there is no such commit.
     """
 
-    project = get_canonical_project(glb, project)
+    project = get_canonical_project(glb, project, lazy=True)
 
-    tags = project.tags.list(iterator=True)
-    if tag := next(filter(lambda t: t.name == tag_name, tags), None):
-        return project.commits.get(tag.commit['id'])
+    try:
+        tag = project.tags.get(tag_name)
+    except gitlab.exceptions.GitlabGetError as exp:
+        if exp.response_code == http.HTTPStatus.NOT_FOUND:
+            return None
+        raise
 
-    return None
+    # The tag already carries the same commit details as commit listing.
+    return gitlab.v4.objects.ProjectCommit(project.commits, tag.commit)
 
 
 def get_commit_before_deadline(
-    glb, project, deadline, branch, commit_filter=lambda commit: True, tag=None
+    glb, project, deadline, branch, commit_filter=None, tag=None
 ):
     """
     Get last commit just before the deadline but prefer a tag if available.
+
+    :param commit_filter: Predicate to skip unwanted commits, None to accept all.
     """
-    project = get_canonical_project(glb, project)
+    project = get_canonical_project(glb, project, lazy=True)
     if tag:
         commit = get_commit_with_tag(glb, project, tag)
         if commit:
@@ -284,34 +926,81 @@ def get_commit_before_deadline(
 
     # By default, commits are ordered in reverse chronological order, i.e.,
     # the most recent first. We therefore take the first matching commit.
-    commits = project.commits.list(ref_name=branch, until=deadline.isoformat(), iterator=True)
-    if commit := next(filter(commit_filter, commits), None):
-        return commit
+    if commit_filter is None:
+        # Without a filter, the first commit is the answer: fetch only that.
+        commits = project.commits.list(
+            ref_name=branch, until=deadline.isoformat(), per_page=1, get_all=False
+        )
+        if commits:
+            return commits[0]
+    else:
+        commits = project.commits.list(
+            ref_name=branch, until=deadline.isoformat(), per_page=100, iterator=True
+        )
+        if commit := next(filter(commit_filter, commits), None):
+            return commit
+
+    raise NoCommitBeforeDeadline("No matching commit found.")
 
-    raise gitlab.exceptions.GitlabGetError("No matching commit found.")
 
+# Protocol v2 lets the server advertise only the refs the client asks for
+# (older Git versions default to v0 that advertises all of them).
+_GIT_TRANSFER_CONFIG = ['-c', 'protocol.version=2']
 
-def clone_or_fetch(glb, project, local_path):
+
+def clone_or_fetch(glb, project, local_path, reference_path=None, checkout=True):
     """
     Clone or update (fetch) to a local repository.
+
+    New clones are partial (without blobs), blobs are downloaded on demand
+    only for the commits that are actually checked out. Subsequent fetches
+    reuse the filter as it is stored in the repository configuration.
+
+    :param glb: GitLab instance.
+    :param project: Project object, path or id; it is resolved only when
+        cloning (to get the SSH URL) and passing an object avoids any
+        additional API request.
+    :param local_path: Path to the local repository.
+    :param reference_path: Local repository (e.g. clone of the parent
+        project) to borrow objects from instead of downloading them.
+    :param checkout: Whether to check out the default branch after clone,
+        pass False when the repository is reset to a commit afterwards.
     """
-    if os.path.isdir(os.path.join(local_path, '.git')):
-        rc = subprocess.call(['git', 'fetch'], cwd=local_path)
+    # Read the directory once instead of probing it with several stat calls.
+    try:
+        with os.scandir(local_path) as it:
+            existing_names = {entry.name for entry in it}
+    except FileNotFoundError:
+        existing_names = None
+    except NotADirectoryError:
+        raise GitCloneError("There is a file in place of the Git directory!")
+
+    if existing_names and ('.git' in existing_names):
+        rc = subprocess.call(
+            ['git', *_GIT_TRANSFER_CONFIG, '-c', 'fetch.negotiationAlgorithm=skipping', 'fetch', '--prune'],
+            cwd=local_path
+        )
         if rc != 0:
-            raise Exception("git fetch failed")
+            raise GitFetchError(f"git fetch failed (exit code {rc})")
         return
 
-    if os.path.isdir(local_path):
-        if os.listdir(local_path):
-            raise Exception("There is non-empty directory that is not Git!")
+    if existing_names:
+        raise GitCloneError("There is non-empty directory that is not Git!")
 
-    pathlib.Path(local_path).mkdir(parents=True, exist_ok=True)
+    if existing_names is None:
+        pathlib.Path(local_path).mkdir(parents=True, exist_ok=True)
 
     project = get_canonical_project(glb, project)
     git_url = project.ssh_url_to_repo
-    rc = subprocess.call(['git', 'clone', git_url, local_path])
+    clone_args = ['git', *_GIT_TRANSFER_CONFIG, 'clone', '--filter=blob:none']
+    if not checkout:
+        clone_args.append('--no-checkout')
+    if reference_path:
+        # Dissociate so that the clone remains usable without the reference.
+        clone_args += ['--reference-if-able', reference_path, '--dissociate']
+    rc = subprocess.call(clone_args + [git_url, local_path])
     if rc != 0:
-        raise Exception("git clone failed")
+        raise GitCloneError(f"git clone failed (exit code {rc})")
 
 
 def reset_to_commit(local_path, commit):
@@ -320,4 +1009,4 @@ def reset_to_commit(local_path, commit):
     """
     rc = subprocess.call(['git', 'reset', '--hard', commit], cwd=local_path)
     if rc != 0:
-        raise Exception("git reset failed")
+        raise GitResetError(f"git reset failed (exit code {rc})")
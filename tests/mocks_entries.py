@@ -3,7 +3,7 @@ class MockEntries:
     def __init__(self, entries):
         self.entries = entries
 
-    def as_gitlab_users(self, _glb, login_column):
+    def as_gitlab_users(self, _glb, login_column, workers=1):
         for entry in self.entries:
             yield entry, None
 
@@ -91,6 +91,14 @@ class MockedGitLabApi:
             **kwargs,
         )
 
+    def on_graphql_post(self, response_json, *args, **kwargs):
+        kwargs['json'] = response_json
+        return self.responses.post(
+            self.base_url + "api/graphql",
+            *args,
+            **kwargs,
+        )
+
     def on_api_delete(self, url, *args, **kwargs):
         return self.responses.delete(
             self.make_api_url_(url),
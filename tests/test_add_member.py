@@ -0,0 +1,134 @@
+import logging
+
+import gitlab
+
+import teachers_gitlab.main as tg
+
+
+def register_user(mock_gitlab, user_id, username):
+    mock_gitlab.on_api_get(
+        'users?username=' + username,
+        response_json=[
+            {
+                'id': user_id,
+                'username': username,
+            }
+        ]
+    )
+
+
+def test_add_members_to_shared_project(mock_gitlab):
+    entries = [
+        {'login': 'alpha'},
+        {'login': 'bravo'},
+        {'login': 'charlie'},
+    ]
+
+    mock_gitlab.register_project(452, 'course/shared')
+    register_user(mock_gitlab, 1, 'alpha')
+    register_user(mock_gitlab, 2, 'bravo')
+    register_user(mock_gitlab, 3, 'charlie')
+
+    mock_gitlab.on_api_get(
+        'projects/452/members',
+        response_json=[
+            {
+                'id': 1,
+                'username': 'alpha',
+                'access_level': 30,
+            }
+        ]
+    )
+    mock_gitlab.on_api_post(
+        'projects/452/invitations',
+        request_json={
+            'user_id': '2,3',
+            'access_level': 30,
+        },
+        response_json={
+            'status': 'success',
+        }
+    )
+
+    mock_gitlab.report_unknown()
+
+    tg.action_add_member(
+        mock_gitlab.get_python_gitlab(),
+        logging.getLogger("add-member"),
+        tg.ActionEntries(entries),
+        'login',
+        False,
+        'course/shared',
+        gitlab.const.AccessLevel.DEVELOPER,
+        1
+    )
+
+    assert len(mock_gitlab.responses.calls) == 6
+
+
+def test_add_members_continues_after_failure(mock_gitlab):
+    entries = [
+        {'login': 'alpha'},
+        {'login': 'bravo'},
+    ]
+
+    mock_gitlab.register_project(452, 'course/shared')
+    register_user(mock_gitlab, 1, 'alpha')
+    register_user(mock_gitlab, 2, 'bravo')
+
+    mock_gitlab.on_api_get(
+        'projects/452/members',
+        response_json=[]
+    )
+    mock_gitlab.on_api_post(
+        'projects/452/invitations',
+        request_json={
+            'user_id': '1,2',
+            'access_level': 30,
+        },
+        response_json={
+            'status': 'error',
+            'message': {
+                'alpha': 'Access level should be greater than or equal to Maintainer inherited membership',
+                'bravo': 'Invite email has already been taken',
+            },
+        }
+    )
+    mock_gitlab.on_api_post(
+        'projects/452/members',
+        request_json={
+            'user_id': 1,
+            'access_level': 30,
+        },
+        response_json={
+            'message': 'Access level should be greater than or equal to Maintainer inherited membership',
+        },
+        status=400,
+    )
+    mock_gitlab.on_api_post(
+        'projects/452/members',
+        request_json={
+            'user_id': 2,
+            'access_level': 30,
+        },
+        response_json={
+            'id': 2,
+            'username': 'bravo',
+            'access_level': 30,
+        }
+    )
+
+    mock_gitlab.report_unknown()
+
+    tg.action_add_member(
+        mock_gitlab.get_python_gitlab(),
+        logging.getLogger("add-member"),
+        tg.ActionEntries(entries),
+        'login',
+        False,
+        'course/shared',
+        gitlab.const.AccessLevel.DEVELOPER,
+        1
+    )
+
+    assert len(mock_gitlab.responses.calls) == 7
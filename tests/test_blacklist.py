@@ -0,0 +1,12 @@
+import teachers_gitlab.main as tg
+
+
+def test_regex_blacklist_filter():
+    assert tg.get_regex_blacklist_filter(None, str) is None
+    assert tg.get_regex_blacklist_filter('', str) is None
+
+    reject_teachers = tg.get_regex_blacklist_filter('.*@teacher[.]example[.]com', str.lower)
+    assert reject_teachers('student@example.com')
+    assert not reject_teachers('Prof@Teacher.example.com')
+    assert not reject_teachers('prof@teacher.example.com')
+    assert reject_teachers('prof@teacher.example.com.evil')
@@ -0,0 +1,46 @@
+import json
+
+import teachers_gitlab.main as tg
+
+def test_commit_stats_from_single_listing(mock_gitlab, capsys):
+    entries = [
+        {'login': 'alpha'},
+    ]
+
+    mock_gitlab.register_project(452, 'student/alpha')
+
+    mock_gitlab.on_api_get(
+        'projects/452/repository/commits?with_stats=True&per_page=100',
+        response_json=[
+            {
+                'id': 'c0ffee',
+                'parent_ids': ['beef'],
+                'title': 'Second',
+                'stats': {'additions': 2, 'deletions': 1, 'total': 3},
+                'author_email': 'alpha@example.com',
+                'authored_date': '2020-01-02T00:00:00Z',
+            },
+            {
+                'id': 'beef',
+                'parent_ids': [],
+                'title': 'First',
+                'stats': {'additions': 1, 'deletions': 0, 'total': 1},
+                'author_email': 'alpha@example.com',
+                'authored_date': '2020-01-01T00:00:00Z',
+            },
+        ],
+    )
+
+    mock_gitlab.report_unknown()
+
+    tg.action_commit_stats(
+        mock_gitlab.get_python_gitlab(),
+        tg.ActionEntries(entries),
+        'student/{login}',
+        1
+    )
+
+    result = json.loads(capsys.readouterr().out)
+    assert result[0]['project'] == 'student/alpha'
+    assert result[0]['commits']['c0ffee']['parents'] == ['beef']
+    assert result[0]['commits']['beef']['line_stats']['total'] == 1
@@ -28,7 +28,8 @@ def test_create_tag_that_does_not_exist(mock_gitlab):
         'student/{login}',
         'tag1',
         '',
-        ''
+        '',
+        1
     )
 
 def test_create_existing_tag(mock_gitlab):
@@ -58,5 +59,6 @@ def test_create_existing_tag(mock_gitlab):
         'student/{login}',
         'tag2',
         'double',
-        ''
+        '',
+        1
     )
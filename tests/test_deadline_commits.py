@@ -0,0 +1,65 @@
+import datetime
+import logging
+
+import pytest
+
+import teachers_gitlab.main as tg
+
+
+def test_deadline_commits_to_file(mock_gitlab, tmp_path):
+    mock_gitlab.register_project(452, 'student/alpha')
+    mock_gitlab.register_project(453, 'student/bravo')
+
+    deadline = datetime.datetime(2024, 1, 1, 12, 0, tzinfo=datetime.timezone.utc)
+    mock_gitlab.on_api_get(
+        'projects/452/repository/commits?ref_name=main&until=2024-01-01T12:00:00%2B00:00&per_page=1',
+        response_json=[
+            {'id': 'abcdef', 'author_email': 'alpha@example.com'},
+        ],
+    )
+    mock_gitlab.on_api_get(
+        'projects/453/repository/commits?ref_name=main&until=2024-01-01T12:00:00%2B00:00&per_page=1',
+        response_json=[],
+    )
+
+    mock_gitlab.report_unknown()
+
+    output = tmp_path / 'commits.csv'
+    tg.action_deadline_commits(
+        mock_gitlab.get_python_gitlab(),
+        logging.getLogger('deadline'),
+        tg.ActionEntries([{'login': 'alpha'}, {'login': 'bravo'}]),
+        'student/{login}',
+        'main',
+        None,
+        deadline,
+        None,
+        'login,commit',
+        '{login},{commit.id}',
+        str(output),
+        2
+    )
+
+    assert output.read_text() == 'login,commit\nalpha,abcdef\nbravo,0000000000000000000000000000000000000000\n'
+
+
+def test_deadline_commits_bad_output_fails_early(mock_gitlab, tmp_path):
+    mock_gitlab.report_unknown()
+
+    with pytest.raises(FileNotFoundError):
+        tg.action_deadline_commits(
+            mock_gitlab.get_python_gitlab(),
+            logging.getLogger('deadline'),
+            tg.ActionEntries([{'login': 'alpha'}]),
+            'student/{login}',
+            'main',
+            None,
+            datetime.datetime(2024, 1, 1, 12, 0, tzinfo=datetime.timezone.utc),
+            None,
+            'login,commit',
+            '{login},{commit.id}',
+            str(tmp_path / 'missing' / 'commits.csv'),
+            1
+        )
+
+    assert len(mock_gitlab.responses.calls) == 0
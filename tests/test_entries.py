@@ -0,0 +1,126 @@
+
+import teachers_gitlab.main as tg
+
+def test_users_looked_up_concurrently(mock_gitlab):
+    # GraphQL not available, users are looked up one by one
+    mock_gitlab.on_graphql_post(
+        {'message': '404 Not Found'},
+        status=404,
+    )
+    mock_gitlab.on_api_get(
+        'users?username=alpha',
+        response_json=[
+            {
+                'id': 5,
+                'username': 'alpha',
+            }
+        ]
+    )
+    mock_gitlab.on_api_get(
+        'users?username=bravo',
+        response_json=[]
+    )
+
+    mock_gitlab.report_unknown()
+
+    entries = tg.ActionEntries([
+        {'login': 'alpha'},
+        {'login': 'bravo'},
+    ])
+    users = list(entries.as_gitlab_users(mock_gitlab.get_python_gitlab(), 'login', 2))
+
+    assert [entry['login'] for entry, _ in users] == ['alpha', 'bravo']
+    assert users[0][1].id == 5
+    assert users[1][1] is None
+
+
+def test_users_looked_up_in_bulk(mock_gitlab):
+    mock_gitlab.on_graphql_post({
+        'data': {
+            'users': {
+                'nodes': [
+                    {
+                        'id': 'gid://gitlab/User/5',
+                        'username': 'Alpha',
+                        'name': 'Alpha Able',
+                    },
+                ],
+            },
+        },
+    })
+    mock_gitlab.on_api_get(
+        'users?username=bravo',
+        response_json=[]
+    )
+
+    mock_gitlab.report_unknown()
+
+    entries = tg.ActionEntries([
+        {'login': 'alpha'},
+        {'login': 'bravo'},
+    ])
+    users = list(entries.as_gitlab_users(mock_gitlab.get_python_gitlab(), 'login'))
+
+    assert users[0][1].id == 5
+    assert users[0][1].username == 'Alpha'
+    assert users[1][1] is None
+
+
+def test_projects_keep_entry_order(mock_gitlab):
+    mock_gitlab.register_project(1, 'course/one')
+    mock_gitlab.register_project(2, 'course/two')
+    mock_gitlab.on_api_get(
+        'projects/' + mock_gitlab.escape_path_in_url('course/three'),
+        response_404=True,
+    )
+
+    mock_gitlab.report_unknown()
+
+    entries = tg.ActionEntries([
+        {'group': 'one'},
+        {'group': 'three'},
+        {'group': 'two'},
+        {'group': 'one'},
+    ])
+    projects = entries.as_gitlab_projects(
+        mock_gitlab.get_python_gitlab(),
+        'course/{group}',
+        allow_duplicates=True
+    )
+
+    assert [(entry['group'], project.id) for entry, project in projects] == [
+        ('one', 1),
+        ('two', 2),
+        ('one', 1),
+    ]
+
+
+def test_projects_prefetched_from_group(mock_gitlab):
+    logins = ['student{:02}'.format(i) for i in range(12)]
+    mock_gitlab.on_api_get(
+        'groups/course/projects?with_shared=False&include_subgroups=False&per_page=100',
+        response_json=[
+            {
+                'id': 100 + i,
+                'path_with_namespace': 'course/' + login,
+            }
+            for i, login in enumerate(logins)
+            if login != 'student05'
+        ],
+    )
+    mock_gitlab.on_api_get(
+        'projects/' + mock_gitlab.escape_path_in_url('course/student05'),
+        response_404=True,
+    )
+
+    mock_gitlab.report_unknown()
+
+    entries = tg.ActionEntries([{'login': login} for login in logins])
+    projects = list(entries.as_gitlab_projects(
+        mock_gitlab.get_python_gitlab(),
+        'course/{login}'
+    ))
+
+    assert len(projects) == 11
+    assert projects[5][1].id == 106
+    assert len(mock_gitlab.responses.calls) == 2
@@ -15,11 +15,13 @@ def test_fork_one(mock_gitlab, mock_entries):
         },
         response_json={
             'id': 17,
+            'path_with_namespace': 'student/alpha',
+            'empty_repo': True,
         }
     )
 
     mock_gitlab.on_api_get(
-        'projects/17',
+        'projects/' + mock_gitlab.escape_path_in_url('student/alpha'),
         response_json={
             'id': 17,
             'path_with_namespace': 'student/alpha',
@@ -31,9 +33,43 @@ def test_fork_one(mock_gitlab, mock_entries):
         response_json={
             'id': 17,
             'path_with_namespace': 'student/alpha',
-            'empty_repo': True,
+            'empty_repo': False,
+        },
+    )
+
+    mock_gitlab.report_unknown()
+
+    teachers_gitlab.main.action_fork(
+        mock_gitlab.get_python_gitlab(),
+        logging.getLogger("fork"),
+        mock_entries.create([
+            {'login': 'alpha'},
+        ]),
+        'login',
+        'base/repo',
+        'student/{login}',
+        False,
+        True,
+        1
+    )
+
+
+def test_fork_already_forked(mock_gitlab, mock_entries):
+    mock_gitlab.register_project(42, 'base/repo')
+
+    mock_gitlab.on_api_post(
+        'projects/42/fork',
+        request_json={
+            'name': 'alpha',
+            'namespace': 'student',
+            'path': 'alpha'
+        },
+        response_json={
+            'message': 'Project namespace name has already been taken',
         },
+        status=409,
     )
+
     mock_gitlab.on_api_get(
         'projects/' + mock_gitlab.escape_path_in_url('student/alpha'),
         response_json={
@@ -55,5 +91,58 @@ def test_fork_one(mock_gitlab, mock_entries):
         'base/repo',
         'student/{login}',
         False,
-        True
+        True,
+        1
+    )
+
+
+def test_fork_skips_existing_forks(mock_gitlab, mock_entries):
+    logins = ['student{:02}'.format(i) for i in range(12)]
+    mock_gitlab.register_project(42, 'base/repo')
+
+    mock_gitlab.on_api_get(
+        'groups/student/projects?with_shared=False&include_subgroups=False&per_page=100',
+        response_json=[
+            {
+                'id': 100 + i,
+                'path_with_namespace': 'student/' + login,
+                'empty_repo': False,
+            }
+            for i, login in enumerate(logins)
+            if login != 'student05'
+        ],
+    )
+
+    mock_gitlab.on_api_post(
+        'projects/42/fork',
+        request_json={
+            'name': 'student05',
+            'namespace': 'student',
+            'path': 'student05'
+        },
+        response_json={
+            'id': 105,
+            'path_with_namespace': 'student/student05',
+            'empty_repo': False,
+        }
+    )
+
+    mock_gitlab.report_unknown()
+
+    teachers_gitlab.main.action_fork(
+        mock_gitlab.get_python_gitlab(),
+        logging.getLogger("fork"),
+        mock_entries.create([
+            {'login': login}
+            for login in logins
+        ]),
+        'login',
+        'base/repo',
+        'student/{login}',
+        False,
+        True,
+        1
     )
+
+    # Group listing, parent project and the single missing fork
+    assert len(mock_gitlab.responses.calls) == 3
@@ -0,0 +1,99 @@
+import json
+
+import teachers_gitlab.main as tg
+
+def test_last_pipeline_with_graphql(mock_gitlab, capsys):
+    mock_gitlab.register_project(452, 'student/alpha')
+
+    mock_gitlab.on_graphql_post({
+        'data': {
+            'project': {
+                'pipelines': {
+                    'nodes': [
+                        {
+                            'id': 'gid://gitlab/Ci::Pipeline/7',
+                            'sha': 'c0ffee',
+                            'status': 'FAILED',
+                            'jobs': {
+                                'pageInfo': {'hasNextPage': False},
+                                'nodes': [
+                                    {'id': 'gid://gitlab/Ci::Build/70', 'name': 'build', 'status': 'SUCCESS'},
+                                    {'id': 'gid://gitlab/Ci::Build/71', 'name': 'test', 'status': 'FAILED'},
+                                ],
+                            },
+                        },
+                    ],
+                },
+            },
+        },
+    })
+
+    mock_gitlab.report_unknown()
+
+    tg.action_get_last_pipeline(
+        mock_gitlab.get_python_gitlab(),
+        tg.ActionEntries([{'login': 'alpha'}]),
+        'student/{login}',
+        False,
+        1
+    )
+
+    assert json.loads(capsys.readouterr().out) == {
+        'student/alpha': {
+            'status': 'failed',
+            'id': 7,
+            'commit': 'c0ffee',
+            'jobs': [
+                {'status': 'failed', 'id': 71, 'name': 'test'},
+                {'status': 'success', 'id': 70, 'name': 'build'},
+            ],
+        },
+    }
+
+
+def test_last_pipeline_without_graphql(mock_gitlab, capsys):
+    mock_gitlab.register_project(452, 'student/alpha')
+    mock_gitlab.register_project(453, 'student/bravo')
+
+    # Tried only once, further projects go to REST API directly.
+    mock_gitlab.on_graphql_post(
+        {'message': '404 Not Found'},
+        status=404,
+    )
+    mock_gitlab.on_api_get(
+        'projects/452/pipelines?per_page=1',
+        response_json=[
+            {'id': 7, 'sha': 'c0ffee', 'status': 'success'},
+        ],
+    )
+    mock_gitlab.on_api_get(
+        'projects/452/pipelines/7/jobs',
+        response_json=[
+            {'id': 70, 'name': 'build', 'status': 'success'},
+        ],
+    )
+    mock_gitlab.on_api_get(
+        'projects/453/pipelines?per_page=1',
+        response_json=[
+            {'id': 8, 'sha': 'bad', 'status': 'failed'},
+        ],
+    )
+    mock_gitlab.on_api_get(
+        'projects/453/pipelines/8/jobs',
+        response_json=[
+            {'id': 80, 'name': 'build', 'status': 'failed'},
+        ],
+    )
+
+    mock_gitlab.report_unknown()
+
+    tg.action_get_last_pipeline(
+        mock_gitlab.get_python_gitlab(),
+        tg.ActionEntries([{'login': 'alpha'}, {'login': 'bravo'}]),
+        'student/{login}',
+        True,
+        1
+    )
+
+    assert capsys.readouterr().out == 'success: 1 (50%)\nfailed: 1 (50%)\ntotal: 2\n'
+    assert len(mock_gitlab.responses.calls) == 7
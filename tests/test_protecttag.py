@@ -33,7 +33,8 @@ def test_protect_tag_with_no_response(mock_gitlab):
         tg.ActionEntries(entries),
         'student/{login}',
         'tag1',
-        'devel'
+        'devel',
+        1
     )
 
 def test_protect_tag_with_normal_access_level(mock_gitlab):
@@ -65,7 +66,8 @@ def test_protect_tag_with_normal_access_level(mock_gitlab):
         tg.ActionEntries(entries),
         'student/{login}',
         'tag1',
-        gitlab.const.AccessLevel.DEVELOPER
+        gitlab.const.AccessLevel.DEVELOPER,
+        1
     )
 
 def test_protect_tag_that_needs_access_level_change(mock_gitlab):
@@ -111,5 +113,6 @@ def test_protect_tag_that_needs_access_level_change(mock_gitlab):
         tg.ActionEntries(entries),
         'student/{login}',
         'tag1',
-        gitlab.const.AccessLevel.MAINTAINER
+        gitlab.const.AccessLevel.MAINTAINER,
+        1
     )
@@ -0,0 +1,202 @@
+import logging
+
+import teachers_gitlab.main as tg
+import teachers_gitlab.utils as mg
+
+
+def test_put_file_only_where_changed(mock_gitlab, tmp_path):
+    local_file = tmp_path / 'handout.txt'
+    local_file.write_bytes(b'hello\n')
+
+    mock_gitlab.register_project(452, 'student/alpha')
+    mock_gitlab.register_project(453, 'student/bravo')
+
+    mock_gitlab.responses.head(
+        mock_gitlab.make_api_url_('projects/452/repository/files/handout.txt'),
+        headers={
+            'X-Gitlab-Content-Sha256': mg.get_content_sha256(b'hello\n'),
+        },
+    )
+    mock_gitlab.responses.head(
+        mock_gitlab.make_api_url_('projects/453/repository/files/handout.txt'),
+        status=404,
+    )
+    mock_gitlab.on_api_post(
+        'projects/453/repository/commits',
+        request_json={
+            'branch': 'main',
+            'commit_message': 'Add handout.txt',
+            'actions': [
+                {
+                    'action': 'create',
+                    'file_path': 'handout.txt',
+                    'content': 'aGVsbG8K',
+                    'encoding': 'base64',
+                },
+            ],
+        },
+        response_json={
+            'id': 'c0ffee',
+        },
+    )
+
+    mock_gitlab.report_unknown()
+
+    tg.action_put_file(
+        mock_gitlab.get_python_gitlab(),
+        logging.getLogger("put-file"),
+        tg.ActionEntries([{'login': 'alpha'}, {'login': 'bravo'}]),
+        False,
+        'student/{login}',
+        str(local_file),
+        'handout.txt',
+        'main',
+        'Add {GL[target_filename]}',
+        False,
+        False,
+        False,
+        2
+    )
+
+
+def test_put_file_one_commit_per_project(mock_gitlab, tmp_path):
+    (tmp_path / 'one.txt').write_bytes(b'1\n')
+    (tmp_path / 'two.txt').write_bytes(b'2\n')
+
+    mock_gitlab.register_project(452, 'student/alpha')
+
+    mock_gitlab.on_api_post(
+        'projects/452/repository/commits',
+        request_json={
+            'branch': 'main',
+            'commit_message': 'Add one.txt\n\nAdd two.txt',
+            'actions': [
+                {
+                    'action': 'create',
+                    'file_path': 'one.txt',
+                    'content': 'MQo=',
+                    'encoding': 'base64',
+                },
+                {
+                    'action': 'create',
+                    'file_path': 'two.txt',
+                    'content': 'Mgo=',
+                    'encoding': 'base64',
+                },
+            ],
+        },
+        response_json={
+            'id': 'c0ffee',
+        },
+    )
+
+    mock_gitlab.report_unknown()
+
+    tg.action_put_file(
+        mock_gitlab.get_python_gitlab(),
+        logging.getLogger("put-file"),
+        tg.ActionEntries([
+            {'login': 'alpha', 'file': 'one.txt'},
+            {'login': 'alpha', 'file': 'two.txt'},
+        ]),
+        False,
+        'student/{login}',
+        str(tmp_path / '{file}'),
+        '{file}',
+        'main',
+        'Add {GL[target_filename]}',
+        True,
+        False,
+        False,
+        2
+    )
+
+    assert len(mock_gitlab.responses.calls) == 2
+
+
+def test_put_file_once_skips_existing(mock_gitlab, tmp_path):
+    local_file = tmp_path / 'handout.txt'
+    local_file.write_bytes(b'hello\n')
+
+    mock_gitlab.register_project(452, 'student/alpha')
+
+    mock_gitlab.responses.head(
+        mock_gitlab.make_api_url_('projects/452/repository/files/handout.txt'),
+        headers={
+            'X-Gitlab-Content-Sha256': mg.get_content_sha256(b'edited\n'),
+        },
+    )
+
+    mock_gitlab.report_unknown()
+
+    tg.action_put_file(
+        mock_gitlab.get_python_gitlab(),
+        logging.getLogger("put-file"),
+        tg.ActionEntries([{'login': 'alpha'}]),
+        False,
+        'student/{login}',
+        str(local_file),
+        'handout.txt',
+        'main',
+        'Add {GL[target_filename]}',
+        False,
+        False,
+        True,
+        1
+    )
+
+    assert len(mock_gitlab.responses.calls) == 2
+
+
+def test_put_file_first_row_wins(mock_gitlab, tmp_path):
+    (tmp_path / 'alpha.txt').write_bytes(b'1\n')
+    (tmp_path / 'bravo.txt').write_bytes(b'2\n')
+
+    mock_gitlab.register_project(452, 'team/shared')
+
+    mock_gitlab.responses.head(
+        mock_gitlab.make_api_url_('projects/452/repository/files/README.txt'),
+        status=404,
+    )
+    mock_gitlab.on_api_post(
+        'projects/452/repository/commits',
+        request_json={
+            'branch': 'main',
+            'commit_message': 'Add README.txt',
+            'actions': [
+                {
+                    'action': 'create',
+                    'file_path': 'README.txt',
+                    'content': 'MQo=',
+                    'encoding': 'base64',
+                },
+            ],
+        },
+        response_json={
+            'id': 'c0ffee',
+        },
+    )
+
+    mock_gitlab.report_unknown()
+
+    tg.action_put_file(
+        mock_gitlab.get_python_gitlab(),
+        logging.getLogger("put-file"),
+        tg.ActionEntries([
+            {'login': 'alpha', 'team': 'shared'},
+            {'login': 'bravo', 'team': 'shared'},
+        ]),
+        False,
+        'team/{team}',
+        str(tmp_path / '{login}.txt'),
+        'README.txt',
+        'main',
+        'Add {GL[target_filename]}',
+        False,
+        False,
+        False,
+        1
+    )
+
+    # Project lookup, a single HEAD request and the commit
+    assert len(mock_gitlab.responses.calls) == 3
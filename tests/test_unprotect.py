@@ -49,7 +49,8 @@ def test_unprotect_branch(mock_gitlab):
         logging.getLogger("unprotect"),
         teachers_gitlab.main.ActionEntries(entries),
         'course/{group}-{login}',
-        'devel'
+        'devel',
+        1
     )
 
 
@@ -88,6 +89,7 @@ def test_unprotect_branch_with_complex_name(mock_gitlab):
         logging.getLogger("unprotect"),
         teachers_gitlab.main.ActionEntries(entries),
         'forks/{login}',
-        'feature/*'
+        'feature/*',
+        1
     )
 
@@ -0,0 +1,405 @@
+
+import gitlab
+import pytest
+import responses
+
+import teachers_gitlab.utils as mg
+
+# The autouse quick_retries fixture replaces mg.retries with a mock
+real_retries = mg.retries
+
+def test_canonical_project_is_cached(mock_gitlab):
+    mock_gitlab.on_api_get(
+        'projects/' + mock_gitlab.escape_path_in_url('base/repo'),
+        response_json={
+            'id': 42,
+            'path_with_namespace': 'base/repo',
+        },
+    )
+
+    mock_gitlab.report_unknown()
+
+    glb = mock_gitlab.get_python_gitlab()
+    first = mg.get_canonical_project(glb, 'base/repo')
+    second = mg.get_canonical_project(glb, 'base/repo')
+    by_id = mg.get_canonical_project(glb, 42)
+
+    assert first is second
+    assert first is by_id
+    assert len(mock_gitlab.responses.calls) == 1
+
+
+def test_canonical_project_cache_invalidation(mock_gitlab):
+    mock_gitlab.on_api_get(
+        'projects/42',
+        response_json={
+            'id': 42,
+            'path_with_namespace': 'base/repo',
+            'empty_repo': True,
+        },
+    )
+    mock_gitlab.on_api_get(
+        'projects/' + mock_gitlab.escape_path_in_url('base/repo'),
+        response_json={
+            'id': 42,
+            'path_with_namespace': 'base/repo',
+            'empty_repo': False,
+        },
+    )
+
+    mock_gitlab.report_unknown()
+
+    glb = mock_gitlab.get_python_gitlab()
+    project = mg.get_canonical_project(glb, 42)
+    assert project.empty_repo
+
+    mg.invalidate_project_cache(glb, project)
+    project = mg.get_canonical_project(glb, 'base/repo')
+    assert not project.empty_repo
+
+
+def test_run_concurrently_keeps_order():
+    assert mg.run_concurrently(lambda x: x * 2, [1, 2, 3, 4], 1) == [2, 4, 6, 8]
+    assert mg.run_concurrently(lambda x: x * 2, [1, 2, 3, 4], 3) == [2, 4, 6, 8]
+
+
+def test_commit_before_deadline_fetches_single_commit(mock_gitlab):
+    mock_gitlab.on_api_get(
+        'projects/' + mock_gitlab.escape_path_in_url('student/alpha') + '/repository/commits',
+        response_json=[
+            {
+                'id': 'c0ffee',
+            },
+        ],
+    )
+
+    mock_gitlab.report_unknown()
+
+    commit = mg.get_commit_before_deadline(
+        mock_gitlab.get_python_gitlab(),
+        'student/alpha',
+        mg.get_timestamp('2020-01-01T00:00:00Z'),
+        'main'
+    )
+
+    assert commit.id == 'c0ffee'
+    commits_request = mock_gitlab.responses.calls[-1].request
+    assert 'per_page=1' in commits_request.url
+
+
+def test_put_files_updates_only_existing_files(mock_gitlab):
+    mock_gitlab.on_api_post(
+        'projects/' + mock_gitlab.escape_path_in_url('student/alpha') + '/repository/commits',
+        request_json={
+            'branch': 'main',
+            'commit_message': 'Update',
+            'actions': [
+                {'action': 'create', 'file_path': 'README.md', 'content': 'a'},
+                {'action': 'create', 'file_path': 'src/new.txt', 'content': 'b'},
+            ],
+        },
+        response_json={
+            'message': 'A file with this name already exists',
+        },
+        status=400,
+    )
+    mock_gitlab.on_api_get(
+        'projects/' + mock_gitlab.escape_path_in_url('student/alpha') + '/repository/tree',
+        response_json=[],
+        match=[responses.matchers.query_param_matcher({'ref': 'main', 'path': 'src'}, strict_match=False)],
+    )
+    mock_gitlab.on_api_get(
+        'projects/' + mock_gitlab.escape_path_in_url('student/alpha') + '/repository/tree',
+        response_json=[
+            {'name': 'README.md', 'type': 'blob'},
+            {'name': 'src', 'type': 'tree'},
+        ],
+        match=[responses.matchers.query_param_matcher({'ref': 'main'}, strict_match=False)],
+    )
+    mock_gitlab.on_api_post(
+        'projects/' + mock_gitlab.escape_path_in_url('student/alpha') + '/repository/commits',
+        request_json={
+            'branch': 'main',
+            'commit_message': 'Update',
+            'actions': [
+                {'action': 'update', 'file_path': 'README.md', 'content': 'a'},
+                {'action': 'create', 'file_path': 'src/new.txt', 'content': 'b'},
+            ],
+        },
+        response_json={
+            'id': 'c0ffee',
+        },
+    )
+
+    mock_gitlab.report_unknown()
+
+    commit = mg.put_files(
+        mock_gitlab.get_python_gitlab(),
+        'student/alpha',
+        'main',
+        [('README.md', 'a'), ('src/new.txt', 'b')],
+        True,
+        'Update'
+    )
+
+    assert commit.id == 'c0ffee'
+
+
+def test_put_file_with_binary_content(mock_gitlab):
+    mock_gitlab.on_api_post(
+        'projects/' + mock_gitlab.escape_path_in_url('student/alpha') + '/repository/commits',
+        request_json={
+            'branch': 'main',
+            'commit_message': 'Add image',
+            'actions': [
+                {
+                    'action': 'create',
+                    'file_path': 'image.png',
+                    'content': 'iVBORw==',
+                    'encoding': 'base64',
+                },
+            ],
+        },
+        response_json={
+            'id': 'c0ffee',
+        },
+    )
+
+    mock_gitlab.report_unknown()
+
+    commit = mg.put_file(
+        mock_gitlab.get_python_gitlab(),
+        'student/alpha',
+        'main',
+        'image.png',
+        b'\x89PNG',
+        False,
+        'Add image'
+    )
+
+    assert commit.id == 'c0ffee'
+
+
+def test_user_lookup_is_cached(mock_gitlab):
+    mock_gitlab.on_api_get(
+        'users?username=alpha',
+        response_json=[
+            {
+                'id': 5,
+                'username': 'alpha',
+            }
+        ]
+    )
+    mock_gitlab.on_api_get(
+        'users?username=bravo',
+        response_json=[]
+    )
+
+    mock_gitlab.report_unknown()
+
+    glb = mock_gitlab.get_python_gitlab()
+    assert mg.get_user_by_username(glb, 'alpha').id == 5
+    assert mg.get_user_by_username(glb, 'Alpha').id == 5
+    assert mg.get_user_by_username(glb, 'bravo') is None
+    assert mg.get_user_by_username(glb, 'bravo') is None
+    assert len(mock_gitlab.responses.calls) == 2
+
+
+def test_download_file(mock_gitlab, tmp_path):
+    mock_gitlab.responses.get(
+        mock_gitlab.make_api_url_(
+            'projects/42/repository/files/' + mock_gitlab.escape_path_in_url('src/main.c') + '/raw'
+        ),
+        body=b'int main() {}\n',
+    )
+    mock_gitlab.on_api_get(
+        'projects/42/repository/files/missing.txt/raw',
+        response_404=True,
+    )
+
+    mock_gitlab.report_unknown()
+
+    glb = mock_gitlab.get_python_gitlab()
+    local_file = tmp_path / 'main.c'
+    size = mg.download_file(glb, 42, 'main', 'src/main.c', str(local_file))
+    assert size == 14
+    assert local_file.read_bytes() == b'int main() {}\n'
+
+    missing_file = tmp_path / 'missing.txt'
+    assert mg.download_file(glb, 42, 'main', 'missing.txt', str(missing_file)) is None
+    assert not missing_file.exists()
+    assert list(tmp_path.iterdir()) == [local_file]
+
+
+def test_http_cache_skips_streamed_requests(mocker, tmp_path):
+    pytest.importorskip('cachecontrol')
+
+    session = mg.create_http_session(cache_dir=str(tmp_path))
+    adapter = session.get_adapter('https://gitlab.example.com/')
+    cached_send = mocker.patch.object(adapter.cached, 'send')
+    plain_send = mocker.patch.object(adapter.plain, 'send')
+
+    adapter.send('download', stream=True)
+    plain_send.assert_called_once_with('download', stream=True)
+
+    adapter.send('api-call')
+    cached_send.assert_called_once_with('api-call', stream=False)
+
+
+def test_download_empty_file_replaces_stale_content(mock_gitlab, tmp_path):
+    mock_gitlab.responses.get(
+        mock_gitlab.make_api_url_('projects/42/repository/files/empty.txt/raw'),
+        body=b'',
+    )
+
+    mock_gitlab.report_unknown()
+
+    local_file = tmp_path / 'empty.txt'
+    local_file.write_bytes(b'stale\n')
+    size = mg.download_file(mock_gitlab.get_python_gitlab(), 42, 'main', 'empty.txt', str(local_file))
+    assert size == 0
+    assert local_file.read_bytes() == b''
+
+
+def test_get_file_sha256(mock_gitlab):
+    content = b'int main() {}\n'
+    mock_gitlab.responses.head(
+        mock_gitlab.make_api_url_(
+            'projects/42/repository/files/' + mock_gitlab.escape_path_in_url('src/main.c')
+        ),
+        headers={
+            'X-Gitlab-Content-Sha256': mg.get_content_sha256(content),
+        },
+    )
+    mock_gitlab.responses.head(
+        mock_gitlab.make_api_url_('projects/42/repository/files/missing.txt'),
+        status=404,
+    )
+
+    mock_gitlab.report_unknown()
+
+    glb = mock_gitlab.get_python_gitlab()
+    assert mg.get_file_sha256(glb, 42, 'main', 'src/main.c') == mg.get_content_sha256(content.decode('utf-8'))
+    assert mg.get_file_sha256(glb, 42, 'main', 'missing.txt') is None
+    assert mg.get_content_sha256(b'') == 'e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855'
+
+
+def test_commit_with_tag_is_fetched_directly(mock_gitlab):
+    mock_gitlab.on_api_get(
+        'projects/42/repository/tags/' + mock_gitlab.escape_path_in_url('hw/01'),
+        response_json={
+            'name': 'hw/01',
+            'commit': {
+                'id': 'abcdef',
+                'created_at': '2024-01-01T10:00:00+00:00',
+            },
+        },
+    )
+    mock_gitlab.on_api_get(
+        'projects/42/repository/tags/missing',
+        response_404=True,
+    )
+
+    mock_gitlab.report_unknown()
+
+    glb = mock_gitlab.get_python_gitlab()
+    commit = mg.get_commit_with_tag(glb, 42, 'hw/01')
+    assert commit.id == 'abcdef'
+    assert commit.created_at == '2024-01-01T10:00:00+00:00'
+    assert mg.get_commit_with_tag(glb, 42, 'missing') is None
+    assert len(mock_gitlab.responses.calls) == 2
+
+
+def test_retry_only_transient_errors(mock_gitlab, monkeypatch):
+    monkeypatch.setattr(mg.time, 'sleep', lambda _: None)
+
+    mock_gitlab.on_api_get(
+        'users?username=alpha',
+        response_json={'message': '503 Service Unavailable'},
+        status=503,
+    )
+    mock_gitlab.on_api_get(
+        'users?username=alpha',
+        response_json=[
+            {
+                'id': 5,
+                'username': 'alpha',
+            }
+        ]
+    )
+    mock_gitlab.on_api_get(
+        'projects/' + mock_gitlab.escape_path_in_url('base/missing'),
+        response_404=True,
+    )
+
+    mock_gitlab.report_unknown()
+
+    glb = mock_gitlab.get_python_gitlab()
+    assert mg.get_user_by_username(glb, 'alpha').id == 5
+    assert len(mock_gitlab.responses.calls) == 2
+
+    with pytest.raises(gitlab.exceptions.GitlabGetError):
+        mg.get_canonical_project(glb, 'base/missing')
+    assert len(mock_gitlab.responses.calls) == 3
+
+
+def test_retry_waits_minutes_in_total(monkeypatch):
+    delays = []
+    monkeypatch.setattr(mg.time, 'sleep', delays.append)
+
+    @mg.retry_on_exception('Failing, will retry...', [ConnectionError])
+    def always_failing():
+        raise ConnectionError()
+
+    with pytest.raises(ConnectionError):
+        always_failing()
+
+    assert len(delays) == 7
+    assert 180 <= sum(delays) <= 300
+
+
+def test_backoff_delay_is_bounded():
+    for attempt in range(1, 20):
+        assert 0 <= mg.get_backoff_delay(attempt, base=1, limit=60) <= min(60, 2 ** (attempt - 1))
+
+
+def test_get_file_contents(mock_gitlab):
+    mock_gitlab.responses.get(
+        mock_gitlab.make_api_url_(
+            'projects/42/repository/files/' + mock_gitlab.escape_path_in_url('docs/README.md') + '/raw'
+        ),
+        body=b'# Readme\n',
+    )
+    mock_gitlab.on_api_get(
+        'projects/42/repository/files/missing.txt/raw',
+        response_404=True,
+    )
+
+    mock_gitlab.report_unknown()
+
+    glb = mock_gitlab.get_python_gitlab()
+    assert mg.get_file_contents(glb, 42, 'main', 'docs/README.md') == b'# Readme\n'
+    assert mg.get_file_contents(glb, 42, 'main', 'missing.txt') is None
+    assert len(mock_gitlab.responses.calls) == 2
+
+
+def test_retries_back_off_up_to_interval(monkeypatch):
+    now = [0.0]
+    delays = []
+
+    def fake_sleep(delay):
+        delays.append(delay)
+        now[0] += delay
+
+    monkeypatch.setattr(mg.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(mg.time, 'sleep', fake_sleep)
+
+    with pytest.raises(Exception, match='timed-out'):
+        for _ in real_retries(timeout=20, interval=2):
+            pass
+
+    assert delays[0] <= 0.25 * 1.25
+    # Capped delays are spread around the interval (the last one is cut
+    # by the deadline).
+    assert all(1.5 <= delay <= 2.5 for delay in delays[4:-1])
+    assert sum(delays) == pytest.approx(20)